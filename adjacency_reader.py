@@ -0,0 +1,195 @@
+import os
+import re
+import mmap
+import argparse
+import numpy as np
+from strength_index import hash_file, source_unchanged
+
+
+MAGIC = b'LSWLOFF1'
+HEADER_SIZE = 64
+HEADER_DTYPE = np.dtype([('magic', 'S8'), ('n', '<i8'), ('source_size', '<i8'), ('source_mtime', '<i8'), ('source_hash', 'S32')])
+CHUNK_SIZE = 1 << 26
+PAGE_SIZE = mmap.PAGESIZE
+# a non-empty line of an adjacency list: its node (first field) and the rest of the line.
+LINE_PATTERN = re.compile(rb'^[ \t]*(-?\d+)[^\n]*', re.M)
+
+
+def create_argument_parser_main():
+	parser = argparse.ArgumentParser()
+	parser.add_argument("-n", "--network", help="adjacency list address")
+	parser.add_argument("-x", "--index", help="path of the offset index, or of a directory receiving it, default is the network address followed by '.lswloff'.")
+	return parser.parse_args()
+
+
+def default_offset_index_path(path, index_path=None):
+	# index_path may also be a directory, the index is then named after the adjacency list in it.
+	if index_path == None:
+		return path + '.lswloff'
+	if os.path.isdir(index_path):
+		return os.path.join(index_path, os.path.basename(path) + '.lswloff')
+	return index_path
+
+
+def scan_lines(path):
+	# node, offset and length of every non-empty line of the file, read in large blocks.
+	nodes, offsets, lengths = [], [], []
+	position = 0
+	with open(path, 'rb') as file:
+		leftover = b''
+		while True:
+			block = file.read(CHUNK_SIZE)
+			at_end = not block
+			block = leftover + block
+			# blocks are cut after their last line break, the last block takes whatever is left.
+			cut = len(block) if at_end else block.rfind(b'\n') + 1
+			for match in LINE_PATTERN.finditer(block, 0, cut):
+				nodes.append(int(match.group(1)))
+				offsets.append(position + match.start())
+				lengths.append(match.end() - match.start())
+			position += cut
+			leftover = block[cut:]
+			if at_end:
+				break
+	return np.array(nodes, dtype=np.int64), np.array(offsets, dtype=np.int64), np.array(lengths, dtype=np.int64)
+
+
+def compute_offset_index(path):
+	# header and (node ids, offsets, lengths) of the lines of the file, as read_offset_index returns them.
+	nodes, offsets, lengths = scan_lines(path)
+	# a node listed on several lines is read from its first one.
+	node_ids, first = np.unique(nodes, return_index=True)
+
+	stat = os.stat(path)
+	header = np.zeros(1, dtype=HEADER_DTYPE)
+	header[0] = (MAGIC, len(node_ids), stat.st_size, stat.st_mtime_ns, hash_file(path))
+	return header[0], np.stack((node_ids, offsets[first], lengths[first])).astype(np.int64)
+
+
+def write_offset_index(index_path, header, arrays):
+	try:
+		with open(index_path + '.tmp', 'wb') as file:
+			file.write(header.tobytes().ljust(HEADER_SIZE, b'\0'))
+			file.write(arrays.astype('<i8').tobytes())
+		os.replace(index_path + '.tmp', index_path)
+	except OSError:
+		if os.path.isfile(index_path + '.tmp'):
+			os.remove(index_path + '.tmp')
+		raise
+	return index_path
+
+
+def build_offset_index(path, index_path=None):
+	return write_offset_index(default_offset_index_path(path, index_path), *compute_offset_index(path))
+
+
+def read_offset_index(index_path):
+	with open(index_path, 'rb') as file:
+		data = file.read(HEADER_DTYPE.itemsize)
+	if len(data) < HEADER_DTYPE.itemsize:
+		return None, None
+	header = np.frombuffer(data, dtype=HEADER_DTYPE)[0]
+	if header['magic'] != MAGIC:
+		return None, None
+	n = int(header['n'])
+	arrays = np.fromfile(index_path, dtype='<i8', count=3 * n, offset=HEADER_SIZE).reshape(3, n)
+	return header, arrays
+
+
+class AdjacencyReader():
+	# reads the neighbors of single nodes from an adjacency list ('node neighbor neighbor ...' per line, any node
+	# ids, any line order). the file is memory mapped and only the requested line is decoded, the index of line
+	# offsets is kept in memory. pages of the mapping are dropped once more than max_resident_bytes were touched.
+	# the index is stored at index_path (a file or a directory, next to the adjacency list by default) for later
+	# runs; when it can not be written there, it is only kept in memory.
+	def __init__(self, path, index_path=None, max_resident_bytes=1 << 26):
+		if not os.path.isfile(path):
+			print("Error: file " + path + " not found!")
+			exit(-1)
+		self.path = path
+		self.index_path = default_offset_index_path(path, index_path)
+		header, arrays = read_offset_index(self.index_path) if os.path.isfile(self.index_path) else (None, None)
+		if header is None or not source_unchanged(path, header):
+			header, arrays = compute_offset_index(path)
+			try:
+				write_offset_index(self.index_path, header, arrays)
+			except OSError as error:
+				print('Warning: the offset index can not be written to ' + self.index_path + ' (' + str(error.strerror) + '), it is kept in memory only.')
+				self.index_path = None
+		self.node_ids, self.offsets, self.lengths = arrays
+
+		self.n = n = len(self.node_ids)
+		if n > 0 and int(self.node_ids[-1]) - int(self.node_ids[0]) + 1 == n:
+			self.base = int(self.node_ids[0])
+		else:
+			self.base = None
+
+		self.file = open(path, 'rb')
+		self.map = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ) if os.path.getsize(path) > 0 else None
+		self.max_resident_bytes = max_resident_bytes
+		self.touched_pages = set()
+		self.pages_released = 0
+
+	def position(self, node):
+		if self.base is not None:
+			i = node - self.base
+			return i if 0 <= i < self.n else -1
+		i = int(self.node_ids.searchsorted(node))
+		if i < self.n and self.node_ids[i] == node:
+			return i
+		return -1
+
+	def has_node(self, node):
+		return self.position(node) >= 0
+
+	def __contains__(self, node):
+		return self.has_node(node)
+
+	def number_of_nodes(self):
+		return self.n
+
+	def nodes(self):
+		return self.node_ids.tolist()
+
+	def neighbors(self, node):
+		i = self.position(node)
+		if i < 0:
+			return []
+		start, length = int(self.offsets[i]), int(self.lengths[i])
+		self.touch(start, length)
+		return [int(x) for x in self.map[start:start + length].split()[1:]]
+
+	def degree(self, node):
+		return len(self.neighbors(node))
+
+	def touch(self, start, length):
+		self.touched_pages.update(range(start // PAGE_SIZE, (start + length) // PAGE_SIZE + 1))
+		if len(self.touched_pages) * PAGE_SIZE > self.max_resident_bytes:
+			self.release_pages()
+
+	def release_pages(self):
+		# the mapping is read-only, dropped pages stay in the page cache and are mapped again on the next read.
+		if hasattr(self.map, 'madvise') and hasattr(mmap, 'MADV_DONTNEED'):
+			self.map.madvise(mmap.MADV_DONTNEED)
+		self.pages_released += len(self.touched_pages)
+		self.touched_pages.clear()
+
+	def memory_usage(self):
+		index_bytes = self.node_ids.nbytes + self.offsets.nbytes + self.lengths.nbytes
+		mapped_bytes = len(self.touched_pages) * PAGE_SIZE
+		return {'index_bytes': index_bytes, 'mapped_bytes': mapped_bytes, 'resident_bytes': index_bytes + mapped_bytes,
+				'max_mapped_bytes': self.max_resident_bytes, 'pages_released': self.pages_released}
+
+	def close(self):
+		if self.map is not None:
+			self.map.close()
+			self.map = None
+		self.file.close()
+
+
+if __name__ == "__main__":
+	args = create_argument_parser_main()
+	if not os.path.isfile(args.network):
+		print("Error: file " + args.network + " not found!")
+		exit(-1)
+	print('offset index written to', build_offset_index(args.network, args.index))
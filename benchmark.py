@@ -0,0 +1,318 @@
+import io
+import os
+import sys
+import glob
+import json
+import time
+import random
+import argparse
+import platform
+import tempfile
+import contextlib
+import subprocess
+import multiprocessing
+import numpy as np
+from math import log
+from graph_loader import load_graph, read_edge_arrays
+from binary_graph import write_binary_graph
+from lswl_offline import LSWLCommunityDiscovery, read_query_nodes
+from lswl_online import OnlineCommunitySearch, open_neighbor_source
+from lswl_plus import LSWLPlusCommunityDetection
+from mod_m import ModularityMCommunityDiscovery
+from mod_r import ModularityRCommunityDiscovery
+
+try:
+	import resource
+except ImportError:
+	resource = None
+
+
+ALGORITHMS = ['lswl_offline', 'lswl_online', 'lswl_plus', 'mod_m', 'mod_r']
+DATASET_DIRECTORIES = ['Dataset Exp 7.2 and 7.3.2', 'Dataset Exp 7.3.1']
+
+
+def create_argument_parser_main():
+	parser = argparse.ArgumentParser()
+	parser.add_argument("-n", "--network", nargs='+', help="network file address(es), default is every LFR network of the dataset directories.")
+	parser.add_argument("-q", "--query_nodes", help="query nodes file address, default is './query_nodes.txt'.")
+	parser.add_argument("-k", "--number_of_queries", help="number of query nodes (from the top of the file) searched per network, default is 100.")
+	parser.add_argument("-a", "--algorithms", nargs='+', help="any of 'lswl_offline', 'lswl_online', 'lswl_plus', 'mod_m' and 'mod_r', default is all of them.")
+	parser.add_argument("-s", "--strength_type", help="1 for weights in [-1,+1] and 2 for weights in [0,1], default is 2.")
+	parser.add_argument("-j", "--json", help="path of the json report, default is './benchmark.json'.")
+	parser.add_argument("-c", "--compare", help="address of an earlier json report to compare the results with.")
+	parser.add_argument("-g", "--format", help="format of the network file, 'edgelist' or 'adjlist' (a node followed by its neighbors on every line), detected from its first lines by default.")
+	return parser.parse_args()
+
+
+def default_networks():
+	networks = []
+	for directory in DATASET_DIRECTORIES:
+		networks += sorted(glob.glob(os.path.join(directory, 'network_*.txt')), key=lambda path: [int(x) if x.isdigit() else x for x in os.path.basename(path).split('_')])
+	return networks
+
+
+def ground_truth_path(network, kind):
+	# 'communities' (the community of every node) or 'partition' (one community per line) next to the network.
+	directory, name = os.path.split(network)
+	if name.startswith('network_') is False:
+		return None
+	path = os.path.join(directory, kind + name[len('network'):])
+	return path if os.path.isfile(path) else None
+
+
+def parse_community(line):
+	# '[1, 2, 3] (3)', as written by the codes of this repository.
+	members = line[line.index('[') + 1:line.index(']')]
+	return [int(x) for x in members.split(',') if x.strip() != '']
+
+
+def read_ground_truth_communities(path):
+	communities = {}
+	with open(path, 'r') as file:
+		for line in file:
+			if line.strip() != '':
+				communities[int(line.split(':')[0])] = parse_community(line)
+	return communities
+
+
+def read_ground_truth_partition(path):
+	with open(path, 'r') as file:
+		return [parse_community(line) for line in file if line.strip() != '']
+
+
+def f1_score(community, truth):
+	common = len(set(community) & set(truth))
+	if common == 0:
+		return 0.0
+	precision, recall = common / len(set(community)), common / len(set(truth))
+	return 2 * precision * recall / (precision + recall)
+
+
+def normalized_mutual_information(partition, truth):
+	# over the nodes labeled by both partitions, a node of several communities is labeled by the first of them.
+	labels, truth_labels = {}, {}
+	for i, community in enumerate(partition):
+		for node in community:
+			labels.setdefault(node, i)
+	for i, community in enumerate(truth):
+		for node in community:
+			truth_labels.setdefault(node, i)
+	nodes = [node for node in truth_labels if node in labels]
+	n = len(nodes)
+	if n == 0:
+		return 0.0
+
+	counts, joint_counts, truth_counts = {}, {}, {}
+	for node in nodes:
+		a, b = labels[node], truth_labels[node]
+		counts[a] = counts.get(a, 0) + 1
+		truth_counts[b] = truth_counts.get(b, 0) + 1
+		joint_counts[(a, b)] = joint_counts.get((a, b), 0) + 1
+	mutual_information = sum(c / n * log(c * n / (counts[a] * truth_counts[b])) for (a, b), c in joint_counts.items())
+	entropy = -sum(c / n * log(c / n) for c in counts.values())
+	truth_entropy = -sum(c / n * log(c / n) for c in truth_counts.values())
+	if entropy + truth_entropy == 0:
+		return 1.0
+	return 2 * mutual_information / (entropy + truth_entropy)
+
+
+def peak_rss_mb():
+	if resource is None:
+		return None
+	peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+	# kilobytes on linux, bytes on macos.
+	return peak / (1 << 20) if sys.platform == 'darwin' else peak / (1 << 10)
+
+
+def create_searcher(algorithm, graph, strength_type, network=None):
+	if algorithm == 'lswl_offline':
+		return LSWLCommunityDiscovery(graph, strength_type, float('inf'))
+	if algorithm == 'lswl_online':
+		# graph is the memory mapped binary graph the online searcher reads its neighbors from.
+		return OnlineCommunitySearch(network, strength_type, float('inf'), graph)
+	if algorithm == 'mod_m':
+		return ModularityMCommunityDiscovery(graph)
+	return ModularityRCommunityDiscovery(graph)
+
+
+def run_queries(searcher, query_nodes):
+	# returns the communities and the time of every query, printing of the searchers is muted.
+	communities, times = [], []
+	with contextlib.redirect_stdout(io.StringIO()):
+		for node in query_nodes:
+			start_time = time.perf_counter()
+			community = searcher.community_search(node)
+			times.append(time.perf_counter() - start_time)
+			communities.append(community)
+			searcher.reset()
+	return communities, times
+
+
+def run_detection(graph, strength_type):
+	# one run of lswl_plus with a fixed random seed.
+	random.seed(1)
+	detector = LSWLPlusCommunityDetection(graph, strength_type, True, False)
+	with contextlib.redirect_stdout(io.StringIO()):
+		start_time = time.perf_counter()
+		partition = detector.community_detection(1, 1)
+		detection_time = time.perf_counter() - start_time
+	return partition, detection_time
+
+
+def benchmark(network, algorithm, all_query_nodes, number_of_queries, strength_type, binary_path=None, file_format=None):
+	# every measure of one algorithm on one network, run in a fresh process for a peak rss of its own. the online
+	# searcher gets the network as a binary graph (binary_path), the others load it in memory.
+	baseline_rss_mb = peak_rss_mb()	# the interpreter and the imported modules, before the network is loaded.
+	random.seed(0)
+	start_time = time.perf_counter()
+	graph = open_neighbor_source(binary_path) if algorithm == 'lswl_online' else load_graph(network, file_format=file_format)
+	load_time = time.perf_counter() - start_time
+	query_nodes = [node for node in all_query_nodes if graph.has_node(node)][:number_of_queries]
+
+	result = {'network': network, 'algorithm': algorithm, 'nodes': graph.number_of_nodes(), 'edges': graph.number_of_edges(),
+			'load_time': load_time, 'queries': 0, 'total_time': None, 'queries_per_second': None, 'latency_ms': None,
+			'communities': None, 'average_community_size': None, 'f1': None, 'nmi': None}
+	if algorithm == 'lswl_plus':
+		partition, detection_time = run_detection(graph, strength_type)
+		community_of = {}
+		for community in partition:
+			for node in community:
+				community_of.setdefault(node, community)
+		communities = [community_of.get(node, [node]) for node in query_nodes]
+		result.update({'total_time': detection_time, 'communities': len(partition),
+				'average_community_size': sum(len(community) for community in partition) / max(len(partition), 1)})
+		truth_path = ground_truth_path(network, 'partition')
+		if truth_path != None:
+			result['nmi'] = normalized_mutual_information(partition, read_ground_truth_partition(truth_path))
+	else:
+		communities, times = run_queries(create_searcher(algorithm, graph, strength_type, network), query_nodes)
+		latency = 1000 * np.array(times) if len(times) > 0 else np.zeros(1)
+		p50, p95, p99 = np.percentile(latency, [50, 95, 99])
+		result.update({'queries': len(times), 'total_time': sum(times), 'queries_per_second': len(times) / sum(times) if sum(times) > 0 else None,
+				'latency_ms': {'mean': float(latency.mean()), 'p50': float(p50), 'p95': float(p95), 'p99': float(p99), 'max': float(latency.max())},
+				'average_community_size': sum(len(community) for community in communities) / max(len(communities), 1)})
+
+	# the f1 score of the community found for (or holding) every query node, against its ground truth community.
+	truth_path = ground_truth_path(network, 'communities')
+	if truth_path != None and len(query_nodes) > 0:
+		truth = read_ground_truth_communities(truth_path)
+		scores = [f1_score(community, truth[node]) for node, community in zip(query_nodes, communities) if node in truth]
+		result['f1'] = sum(scores) / len(scores) if len(scores) > 0 else None
+	result['peak_rss_mb'] = peak_rss_mb()
+	result['baseline_rss_mb'] = baseline_rss_mb
+	return result
+
+
+def report_to_pipe(connection, function, args):
+	try:
+		connection.send(function(*args))
+	except BaseException as error:
+		connection.send(error)
+	connection.close()
+
+
+def run_in_own_process(function, *args):
+	# a spawned process starts from a fresh interpreter, a forked one would start with the memory of this one in its
+	# peak rss.
+	context = multiprocessing.get_context('spawn')
+	receiver, sender = context.Pipe(duplex=False)
+	process = context.Process(target=report_to_pipe, args=(sender, function, args))
+	process.start()
+	sender.close()
+	result = receiver.recv()
+	process.join()
+	if isinstance(result, BaseException):
+		raise result
+	return result
+
+
+def git_commit():
+	try:
+		directory = os.path.dirname(os.path.abspath(__file__))
+		return subprocess.run(['git', 'rev-parse', 'HEAD'], cwd=directory, capture_output=True, text=True, check=True).stdout.strip()
+	except (OSError, subprocess.CalledProcessError):
+		return None
+
+
+def summary(result):
+	line = result['network'] + ' ' + result['algorithm']
+	if result['latency_ms'] != None:
+		line += ' | queries: %d | %.1f queries/s | p50: %.2f ms | p95: %.2f ms | p99: %.2f ms' % (result['queries'], result['queries_per_second'] or 0.0,
+				result['latency_ms']['p50'], result['latency_ms']['p95'], result['latency_ms']['p99'])
+	else:
+		line += ' | detection: %.3f s | communities: %d' % (result['total_time'], result['communities'])
+	if result['peak_rss_mb'] != None:
+		line += ' | peak rss: %.1f MB (%.1f MB above the interpreter and imports)' % (result['peak_rss_mb'], result['peak_rss_mb'] - result['baseline_rss_mb'])
+	if result['f1'] != None:
+		line += ' | f1: %.4f' % result['f1']
+	if result['nmi'] != None:
+		line += ' | nmi: %.4f' % result['nmi']
+	return line
+
+
+def compare(results, earlier_report):
+	# ratios of speed (above 1 is faster now) and differences of quality, against the same runs of an earlier report.
+	earlier = {(result['network'], result['algorithm']): result for result in earlier_report['results']}
+	print('compared with', earlier_report.get('commit'), ':')
+	for result in results:
+		old = earlier.get((result['network'], result['algorithm']))
+		if old is None:
+			continue
+		line = result['network'] + ' ' + result['algorithm']
+		if result['total_time'] and old['total_time']:
+			line += ' | speedup: %.2fx' % (old['total_time'] / result['total_time'])
+		if result['latency_ms'] != None and old['latency_ms'] != None and result['latency_ms']['p95'] > 0:
+			line += ' | p95 speedup: %.2fx' % (old['latency_ms']['p95'] / result['latency_ms']['p95'])
+		if result['peak_rss_mb'] != None and old['peak_rss_mb'] != None:
+			line += ' | peak rss: %+.1f MB' % (result['peak_rss_mb'] - old['peak_rss_mb'])
+		for measure in ['f1', 'nmi']:
+			if result[measure] != None and old[measure] != None:
+				line += ' | ' + measure + ': %+.4f' % (result[measure] - old[measure])
+		print(line)
+
+
+if __name__ == "__main__":
+	args = create_argument_parser_main()
+	networks = args.network if args.network != None else default_networks()
+	all_query_nodes = read_query_nodes(args.query_nodes if args.query_nodes != None else 'query_nodes.txt')
+	number_of_queries = int(args.number_of_queries) if args.number_of_queries != None else 100
+	algorithms = args.algorithms if args.algorithms != None else ALGORITHMS
+	if args.strength_type != None and args.strength_type not in ['1', '2']:
+		print("Error: unknown strength type " + args.strength_type + "!")
+		exit(-1)
+	strength_type = 1 if args.strength_type == '1' else 2
+	output = args.json if args.json != None else 'benchmark.json'
+	for algorithm in algorithms:
+		if algorithm not in ALGORITHMS:
+			print("Error: unknown algorithm " + algorithm + "!")
+			exit(-1)
+	for network in networks:
+		if not os.path.isfile(network):
+			print("Error: file " + network + " not found!")
+			exit(-1)
+	earlier_report = None
+	if args.compare != None:
+		if not os.path.isfile(args.compare):
+			print("Error: file " + args.compare + " not found!")
+			exit(-1)
+		with open(args.compare, 'r') as file:
+			earlier_report = json.load(file)
+
+	results = []
+	with tempfile.TemporaryDirectory() as directory:
+		for network in networks:
+			# the binary graph read by lswl_online is written here, so that its peak rss only counts the search.
+			binary_path = None
+			if 'lswl_online' in algorithms:
+				binary_path = write_binary_graph(os.path.join(directory, 'network.lswlg'), *read_edge_arrays(network, file_format=args.format))
+			for algorithm in algorithms:
+				results.append(run_in_own_process(benchmark, network, algorithm, all_query_nodes, number_of_queries, strength_type, binary_path, args.format))
+				print(summary(results[-1]))
+
+	report = {'commit': git_commit(), 'created': time.strftime('%Y-%m-%dT%H:%M:%S'), 'python': platform.python_version(), 'platform': platform.platform(),
+			'number_of_queries': number_of_queries, 'strength_type': strength_type, 'results': results}
+	with open(output, 'w') as file:
+		json.dump(report, file, indent=1)
+	print('report written to', output)
+	if earlier_report != None:
+		compare(results, earlier_report)
@@ -0,0 +1,167 @@
+import networkx as nx
+import os.path
+import argparse
+import numpy as np
+from csr_graph import CSRGraph
+
+try:
+	import zstandard
+except ImportError:
+	zstandard = None
+
+try:
+	import lz4.frame
+except ImportError:
+	lz4 = None
+
+
+MAGIC = b'LSWLGRF1'
+CODECS = {None: 0, 'zstd': 1, 'lz4': 2}
+HEADER_DTYPE = np.dtype([('magic', 'S8'), ('codec', '<i4'), ('indptr_itemsize', '<i4'), ('n', '<i8'), ('m', '<i8'), ('e', '<i8'),
+		('payload_size', '<i8'), ('raw_size', '<i8')])
+HEADER_SIZE = 64
+
+
+def create_argument_parser_main():
+	parser = argparse.ArgumentParser()
+	parser.add_argument("-n", "--network", nargs='+', help="network file address(es)")
+	parser.add_argument("-c", "--compression", help="'zstd' or 'lz4', default is no compression (the file can then be memory mapped).")
+	parser.add_argument("-o", "--output", help="path of the output file when a single network is converted, default is the network address with '.lswlg' extension.")
+	parser.add_argument("-g", "--format", help="format of the network file, 'edgelist' or 'adjlist' (a node followed by its neighbors on every line), detected from its first lines by default.")
+	return parser.parse_args()
+
+
+def default_binary_path(path):
+	return os.path.splitext(path)[0] + '.lswlg'
+
+
+def is_binary_graph(path):
+	if not os.path.isfile(path):
+		return False
+	with open(path, 'rb') as file:
+		return file.read(len(MAGIC)) == MAGIC
+
+
+def payload_layout(n, m, e, indptr_itemsize):
+	# node id remap table, CSR arrays and the deduplicated edges (node positions) in their original order.
+	layout, offset = [], 0
+	for name, dtype, count in [('node_ids', '<i8', n), ('indptr', '<i%d' % indptr_itemsize, n + 1), ('indices', '<i4', m), ('order', '<i4', m), ('edges', '<i4', 2 * e)]:
+		layout.append((name, dtype, count, offset))
+		offset += (count * np.dtype(dtype).itemsize + 7) // 8 * 8
+	return layout, offset
+
+
+def compress(payload, compression):
+	if compression == 'zstd':
+		if zstandard is None:
+			print("Error: zstd compression needs the 'zstandard' package!")
+			exit(-1)
+		return zstandard.ZstdCompressor().compress(payload)
+	if compression == 'lz4':
+		if lz4 is None:
+			print("Error: lz4 compression needs the 'lz4' package!")
+			exit(-1)
+		return lz4.frame.compress(payload)
+	return payload
+
+
+def decompress(payload, codec, raw_size):
+	if codec == CODECS['zstd']:
+		if zstandard is None:
+			print("Error: reading a zstd compressed graph needs the 'zstandard' package!")
+			exit(-1)
+		return zstandard.ZstdDecompressor().decompress(payload, max_output_size=raw_size)
+	if codec == CODECS['lz4']:
+		if lz4 is None:
+			print("Error: reading a lz4 compressed graph needs the 'lz4' package!")
+			exit(-1)
+		return lz4.frame.decompress(payload)
+	return payload
+
+
+def write_binary_graph(path, v1, v2, node_ids, compression=None):
+	# v1 and v2 are the edges of the graph in file order (original node ids, without self-loops).
+	node_ids = np.asarray(node_ids, dtype=np.int64)
+	csr = CSRGraph.from_edge_list(v1, v2, node_ids)
+	a, b = np.searchsorted(node_ids, v1), np.searchsorted(node_ids, v2)
+	first = np.unique(np.minimum(a, b) * len(node_ids) + np.maximum(a, b), return_index=True)[1]
+	first.sort()
+	edges = np.stack((a[first], b[first]), axis=1).ravel()
+
+	n, m, e = csr.n, len(csr.indices), len(first)
+	indptr_itemsize = 4 if m < 2 ** 31 else 8
+	arrays = {'node_ids': csr.node_ids, 'indptr': csr.indptr, 'indices': csr.indices, 'order': csr.order, 'edges': edges}
+	layout, raw_size = payload_layout(n, m, e, indptr_itemsize)
+	payload = bytearray(raw_size)
+	for name, dtype, count, offset in layout:
+		data = np.ascontiguousarray(arrays[name], dtype=dtype).tobytes()
+		payload[offset:offset + len(data)] = data
+	payload = compress(bytes(payload), compression)
+
+	header = np.zeros(1, dtype=HEADER_DTYPE)
+	header[0] = (MAGIC, CODECS[compression], indptr_itemsize, n, m, e, len(payload), raw_size)
+	with open(path, 'wb') as file:
+		file.write(header.tobytes().ljust(HEADER_SIZE, b'\0'))
+		file.write(payload)
+	return path
+
+
+def read_binary_arrays(path):
+	with open(path, 'rb') as file:
+		header = np.frombuffer(file.read(HEADER_DTYPE.itemsize), dtype=HEADER_DTYPE)[0]
+		if header['magic'] != MAGIC:
+			print("Error: file " + path + " is not a binary graph!")
+			exit(-1)
+		n, m, e = int(header['n']), int(header['m']), int(header['e'])
+		layout = payload_layout(n, m, e, int(header['indptr_itemsize']))[0]
+
+		arrays = {}
+		if header['codec'] == CODECS[None]:
+			# uncompressed files are only mapped, the os loads the pages that are used.
+			for name, dtype, count, offset in layout:
+				arrays[name] = np.memmap(path, dtype=dtype, mode='r', offset=HEADER_SIZE + offset, shape=(count,)) if count > 0 else np.zeros(0, dtype=dtype)
+		else:
+			file.seek(HEADER_SIZE)
+			payload = decompress(file.read(int(header['payload_size'])), int(header['codec']), int(header['raw_size']))
+			for name, dtype, count, offset in layout:
+				arrays[name] = np.frombuffer(payload, dtype=dtype, count=count, offset=offset)
+	return arrays
+
+
+def first_appearance_order(edges, n):
+	# positions of the nodes in the order they first appear in the edges, nodes without an edge last.
+	appearing, first = np.unique(edges, return_index=True)
+	isolated = np.setdiff1d(np.arange(n), appearing)
+	return np.concatenate((appearing[np.argsort(first)], isolated))
+
+
+def read_binary_graph(path):
+	arrays = read_binary_arrays(path)
+	node_order = first_appearance_order(np.asarray(arrays['edges'], dtype=np.int64), len(arrays['node_ids']))
+	return CSRGraph(arrays['node_ids'], arrays['indptr'], arrays['indices'], arrays['order'], node_order=node_order)
+
+
+def read_binary_graph_networkx(path):
+	# nodes are added in the order they first appear in the edges, and edges in their original order, as load_graph does.
+	arrays = read_binary_arrays(path)
+	node_ids, edges = np.asarray(arrays['node_ids']), np.asarray(arrays['edges'], dtype=np.int64)
+	node_order = first_appearance_order(edges, len(node_ids))
+
+	graph = nx.Graph()
+	graph.add_nodes_from(node_ids[node_order].tolist())
+	ids = node_ids[edges].reshape(-1, 2)
+	graph.add_edges_from(zip(ids[:, 0].tolist(), ids[:, 1].tolist()), weight=1.0)
+	return graph
+
+
+if __name__ == "__main__":
+	from graph_loader import read_edge_arrays
+
+	args = create_argument_parser_main()
+	if args.compression not in CODECS:
+		print("Error: unknown compression " + args.compression + "!")
+		exit(-1)
+	for network in args.network:
+		v1, v2, node_ids = read_edge_arrays(network, file_format=args.format)
+		output = args.output if args.output != None and len(args.network) == 1 else default_binary_path(network)
+		print(network, '->', write_binary_graph(output, v1, v2, node_ids, args.compression))
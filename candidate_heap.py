@@ -0,0 +1,64 @@
+from heapq import heappush, heappop
+
+
+class CandidateHeap():
+	# improvements of the shell nodes, kept in a max-heap with lazy invalidation: every change pushes a new entry
+	# and entries that no longer match the improvement of their node (or whose node left) are dropped when they
+	# reach the top. the best candidate is the same as a scan of the shell for the first maximum would give, so
+	# ties are broken by the iteration order of the shell set. that order depends on the sequence in which nodes
+	# were added to and discarded from the set, which is why the searchers update their shell by adding all the
+	# neighbors of a new member and discarding the members among them again, as a full pass over the community did.
+	def __init__(self):
+		self.values = {}
+		self.heap = []
+
+	def __contains__(self, node):
+		return node in self.values
+
+	def __getitem__(self, node):
+		return self.values[node]
+
+	def __len__(self):
+		return len(self.values)
+
+	def add(self, node, improvement):
+		if node in self.values:
+			improvement = self.values[node] + improvement
+		self.values[node] = improvement
+		heappush(self.heap, (-improvement, node))
+
+	def remove(self, node):
+		self.values.pop(node, None)
+
+	def clear(self):
+		self.values.clear()
+		self.heap.clear()
+
+	def is_valid(self, entry):
+		return self.values.get(entry[1]) == -entry[0]
+
+	def best(self, shell):
+		heap = self.heap
+		while len(heap) > 0 and self.is_valid(heap[0]) is False:
+			heappop(heap)
+		if len(heap) == 0:
+			return None, -float('inf')
+
+		best_entry = heappop(heap)
+		if len(heap) == 0 or heap[0][0] != best_entry[0]:
+			heappush(heap, best_entry)
+			return best_entry[1], -best_entry[0]
+
+		# several nodes share the best improvement, the scan order of the shell decides between them.
+		tied = set([best_entry[1]])
+		while len(heap) > 0 and heap[0][0] == best_entry[0]:
+			entry = heappop(heap)
+			if self.is_valid(entry):
+				tied.add(entry[1])
+		for node in tied:
+			heappush(heap, (best_entry[0], node))
+		if len(tied) == 1:
+			return best_entry[1], -best_entry[0]
+		for node in shell:
+			if node in tied:
+				return node, -best_entry[0]
@@ -0,0 +1,189 @@
+import numpy as np
+
+
+class CSRGraph():
+	# read-only undirected graph stored as CSR arrays. rows of 'indices' are sorted by neighbor position so that
+	# edge lookups are binary searches, 'order' keeps the original (edge list) order of every row so that neighbor
+	# iteration, and therefore tie-breaking in the searches, is the same as with networkx. likewise 'node_order'
+	# keeps the positions of the nodes in the order networkx would add them, reported by nodes().
+	def __init__(self, node_ids, indptr, indices, order=None, strength=None, node_order=None):
+		self.node_ids = node_ids
+		self.node_order = node_order
+		self.indptr = indptr
+		self.indices = indices
+		self.order = order
+		self.strength = strength if strength is not None else np.zeros(len(indices), dtype=np.float64)	# float64, as networkx attributes.
+		self.precomputed_strength_type = None
+		self.reverse = None	# slot of the opposite direction of every slot, built when strengths are first set by rows.
+
+		self.n = n = len(node_ids)
+		if n > 0 and int(node_ids[-1]) - int(node_ids[0]) + 1 == n:
+			self.base = int(node_ids[0])
+		else:
+			self.base = None
+
+	@classmethod
+	def from_edge_arrays(cls, src, dst, node_ids):
+		# src and dst hold node positions of every directed slot (both directions of each edge, no duplicates),
+		# in the order the neighbors should be reported.
+		n, m = len(node_ids), len(src)
+		src = np.asarray(src, dtype=np.int64)
+		dst = np.asarray(dst, dtype=np.int64)
+
+		indptr = np.zeros(n + 1, dtype=np.int64)
+		np.cumsum(np.bincount(src, minlength=n), out=indptr[1:])
+
+		sorted_slots = np.lexsort((dst, src))
+		indices = dst[sorted_slots].astype(np.int32)
+
+		position_in_sorted = np.empty(m, dtype=np.int64)
+		position_in_sorted[sorted_slots] = np.arange(m, dtype=np.int64)
+		appearance = np.argsort(src, kind='stable')
+		order = (position_in_sorted[appearance] - indptr[src[appearance]]).astype(np.int32)
+
+		return cls(np.asarray(node_ids, dtype=np.int64), indptr, indices, order)
+
+	@classmethod
+	def from_edge_list(cls, v1, v2, node_ids=None):
+		# v1 and v2 are the two columns of an edge list (original node ids, self-loops already dropped). the
+		# neighbors of a node keep the order in which its edges first appear, as networkx would add them.
+		v1 = np.asarray(v1, dtype=np.int64)
+		v2 = np.asarray(v2, dtype=np.int64)
+		if node_ids is None:
+			node_ids = np.unique(np.concatenate((v1, v2)))
+		n = len(node_ids)
+		a, b = np.searchsorted(node_ids, v1), np.searchsorted(node_ids, v2)
+		src = np.stack((a, b), axis=1).ravel()
+		dst = np.stack((b, a), axis=1).ravel()
+
+		first = np.unique(src * n + dst, return_index=True)[1]
+		first.sort()
+		return cls.from_edge_arrays(src[first], dst[first], node_ids)
+
+	@classmethod
+	def from_networkx(cls, graph):
+		node_ids = np.array(sorted(graph.nodes()), dtype=np.int64)
+		position = {node: i for i, node in enumerate(node_ids.tolist())}
+		src, dst = [], []
+		for node in graph.nodes():
+			for neighbor in graph.neighbors(node):
+				if neighbor != node:
+					src.append(position[node])
+					dst.append(position[neighbor])
+		return cls.from_edge_arrays(src, dst, node_ids)
+
+	def position(self, node):
+		if self.base is not None:
+			i = node - self.base
+			return i if 0 <= i < self.n else -1
+		i = int(self.node_ids.searchsorted(node))
+		if i < self.n and self.node_ids[i] == node:
+			return i
+		return -1
+
+	def slot_by_position(self, i, j):
+		start, end = self.indptr[i], self.indptr[i + 1]
+		k = start + int(self.indices[start:end].searchsorted(j))
+		if k < end and self.indices[k] == j:
+			return k
+		return -1
+
+	def slot(self, node, neighbor):
+		i, j = self.position(node), self.position(neighbor)
+		if i < 0 or j < 0:
+			return -1
+		return self.slot_by_position(i, j)
+
+	def nodes(self):
+		if self.node_order is None:
+			return self.node_ids.tolist()
+		return self.node_ids[self.node_order].tolist()
+
+	def number_of_nodes(self):
+		return self.n
+
+	def number_of_edges(self):
+		return len(self.indices) // 2
+
+	def has_node(self, node):
+		return self.position(node) >= 0
+
+	def __contains__(self, node):
+		return self.has_node(node)
+
+	def has_edge(self, node, neighbor):
+		return self.slot(node, neighbor) >= 0
+
+	def degree(self, node):
+		i = self.position(node)
+		return int(self.indptr[i + 1] - self.indptr[i])
+
+	def row_slots(self, i):
+		# slots of the row of position i, in the order its neighbors are reported.
+		start, end = self.indptr[i], self.indptr[i + 1]
+		if self.order is None:
+			return np.arange(start, end)
+		return start + self.order[start:end]
+
+	def reverse_slots(self):
+		if self.reverse is None:
+			sources = np.repeat(np.arange(self.n, dtype=np.int64), np.diff(self.indptr))
+			edge_keys = sources * self.n + self.indices
+			self.reverse = np.searchsorted(edge_keys, self.indices.astype(np.int64) * self.n + sources)
+		return self.reverse
+
+	def neighbor_positions(self, i):
+		start, end = self.indptr[i], self.indptr[i + 1]
+		if self.order is None:
+			return self.indices[start:end]
+		return self.indices[start + self.order[start:end]]
+
+	def neighbors(self, node):
+		row = self.neighbor_positions(self.position(node))
+		if self.base is not None:
+			return (row + self.base).tolist()
+		return self.node_ids[row].tolist()
+
+	def number_of_common_neighbors(self, node, neighbor):
+		i, j = self.position(node), self.position(neighbor)
+		row_i = self.indices[self.indptr[i]:self.indptr[i + 1]]
+		row_j = self.indices[self.indptr[j]:self.indptr[j + 1]]
+		return int(np.intersect1d(row_i, row_j, assume_unique=True).size)
+
+	def common_neighbor_counts(self, node):
+		# number of common neighbors of node and each of its neighbors, in the order of neighbors(node). the rows of
+		# all neighbors are searched in the sorted row of node at once.
+		i = self.position(node)
+		own = self.indices[self.indptr[i]:self.indptr[i + 1]]
+		row = self.neighbor_positions(i)
+		if len(row) == 0:
+			return []
+		starts = self.indptr[row]
+		lengths = self.indptr[row + 1] - starts
+		total = int(lengths.sum())
+		others = self.indices[np.repeat(starts - np.cumsum(lengths) + lengths, lengths) + np.arange(total)]
+		found = own[np.minimum(np.searchsorted(own, others), len(own) - 1)] == others
+		return np.bincount(np.repeat(np.arange(len(row)), lengths)[found], minlength=len(row)).tolist()
+
+	def get_strength(self, node, neighbor):
+		k = self.slot(node, neighbor)
+		return float(self.strength[k]) if k >= 0 else 0.0
+
+	def set_strength(self, node, neighbor, strength):
+		# an undirected edge has a single strength, exactly like the 'strength' attribute of a networkx edge.
+		self.strength[self.slot(node, neighbor)] = strength
+		self.strength[self.slot(neighbor, node)] = strength
+
+	def set_neighbor_strengths(self, node, strengths):
+		# strengths of all edges of node at once, given in the order of neighbors(node).
+		slots = self.row_slots(self.position(node))
+		strengths = np.asarray(strengths, dtype=np.float64)
+		self.strength[slots] = strengths
+		self.strength[self.reverse_slots()[slots]] = strengths
+
+	def neighbor_strengths(self, node):
+		# in the order of neighbors(node), as the 'strength' attributes of a networkx node.
+		slots = self.row_slots(self.position(node))
+		row = self.indices[slots]
+		neighbors = (row + self.base).tolist() if self.base is not None else self.node_ids[row].tolist()
+		return dict(zip(neighbors, self.strength[slots].tolist()))
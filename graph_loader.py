@@ -0,0 +1,174 @@
+import networkx as nx
+import os.path
+import numpy as np
+from csr_graph import CSRGraph
+from binary_graph import is_binary_graph, read_binary_graph, read_binary_graph_networkx
+
+
+CHUNK_SIZE = 1 << 26
+FORMATS = ['edgelist', 'adjlist']
+
+
+def check_file_format(file_format):
+	if file_format != None and file_format not in FORMATS:
+		print("Error: unknown network format " + str(file_format) + ", 'edgelist' or 'adjlist' is expected!")
+		exit(-1)
+
+
+def detect_format(path, delimiter=None, sample_lines=100):
+	# an edge list has the same number of fields on every line (2, or 3 when weighted), an adjacency list
+	# ('node neighbor neighbor ...', as used by lswl_online.py and the C++ implementation) does not. two fields
+	# are the same edges either way, but three integers on every line may be both an edge list with integer
+	# weights and an adjacency list in which every node has two neighbors, the format then needs to be given.
+	field_counts, integer_third_fields = set(), True
+	with open(path, 'rb') as file:
+		for e, line in enumerate(file):
+			if e == sample_lines:
+				break
+			if delimiter is not None and not delimiter.isspace():
+				line = line.replace(delimiter.encode(), b' ')
+			fields = line.split()
+			if len(fields) > 0:
+				field_counts.add(len(fields))
+			if len(fields) == 3 and fields[2].lstrip(b'+-').isdigit() is False:
+				integer_third_fields = False
+
+	if field_counts == set([2]) or (field_counts == set([3]) and integer_third_fields is False):
+		return 'edgelist'
+	if field_counts == set([3]):
+		print("Error: the format of " + path + " is ambiguous (three integers on every line), give it as 'edgelist' or 'adjlist'!")
+		exit(-1)
+	return 'adjlist'
+
+
+def read_chunks(path, delimiter=None):
+	# yields the text of the file in large blocks that always end at a line break.
+	with open(path, 'rb') as file:
+		leftover = b''
+		while True:
+			block = file.read(CHUNK_SIZE)
+			if not block:
+				break
+			block = leftover + block
+			cut = block.rfind(b'\n') + 1
+			if cut == 0:
+				leftover = block
+				continue
+			leftover = block[cut:]
+			yield decode_chunk(block[:cut], delimiter)
+		if leftover.strip():
+			yield decode_chunk(leftover, delimiter)
+
+
+def decode_chunk(block, delimiter):
+	text = block.decode()
+	if delimiter is not None and not delimiter.isspace():
+		text = text.replace(delimiter, ' ')
+	return text
+
+
+def parse_edge_list_chunk(text, weighted):
+	fields = len(text.lstrip().split('\n', 1)[0].split())
+	values = np.fromstring(text, dtype=np.int64 if fields == 2 else np.float64, sep=' ')
+	if fields < (3 if weighted else 2) or len(values) % fields != 0:
+		print("Error: every line of an edge list needs the same number of fields!")
+		exit(-1)
+	values = values.reshape(-1, fields)
+	v1, v2 = values[:, 0].astype(np.int64), values[:, 1].astype(np.int64)
+	w = values[:, 2] if fields == 3 else None
+	return v1, v2, w
+
+
+def parse_adjacency_list_chunk(text):
+	lines = [line for line in text.split('\n') if line.strip()]
+	lengths = np.array([len(line.split()) for line in lines], dtype=np.int64)
+	values = np.fromstring(' '.join(lines), dtype=np.int64, sep=' ')
+	heads = np.cumsum(lengths) - lengths
+	is_head = np.zeros(len(values), dtype=bool)
+	is_head[heads] = True
+	v1 = np.repeat(values[heads], lengths - 1)
+	v2 = values[~is_head]
+	return v1, v2, None, values[heads]
+
+
+def iterate_edges(path, weighted=False, delimiter=None, file_format=None):
+	# yields (v1, v2, w, extra_nodes) arrays per chunk, extra_nodes are nodes that may have no edge at all.
+	check_file_format(file_format)
+	file_format = file_format if file_format != None else detect_format(path, delimiter)
+	if file_format == 'adjlist' and weighted:
+		print("Error: adjacency lists have no weights, " + path + " can only be read unweighted!")
+		exit(-1)
+	ignored_weights = False
+	for text in read_chunks(path, delimiter):
+		if file_format == 'adjlist':
+			yield parse_adjacency_list_chunk(text)
+		else:
+			v1, v2, w = parse_edge_list_chunk(text, weighted)
+			if w is not None and weighted is False:
+				if ignored_weights is False:
+					print('Warning: the third column of ' + path + ' is ignored, the graph is read unweighted.')
+					ignored_weights = True
+				w = None
+			yield v1, v2, w, None
+
+
+def load_graph(path, weighted=False, delimiter=None, self_loop=False, backend='nx', file_format=None):
+	# delimiter None means any whitespace, so both the tab separated datasets and space separated files are read.
+	if not os.path.isfile(path):
+		print("Error: file " + path + " not found!")
+		exit(-1)
+
+	if is_binary_graph(path):
+		if weighted or self_loop:
+			print("Error: binary graphs are unweighted and have no self-loops!")
+			exit(-1)
+		return read_binary_graph(path) if backend == 'csr' else read_binary_graph_networkx(path)
+
+	if backend == 'csr':
+		if weighted or self_loop:
+			print("Error: CSR graphs are unweighted and have no self-loops!")
+			exit(-1)
+		return load_csr_graph(path, delimiter, file_format)
+
+	graph = nx.Graph()
+	for v1, v2, w, extra_nodes in iterate_edges(path, weighted, delimiter, file_format):
+		if extra_nodes is not None:
+			graph.add_nodes_from(extra_nodes.tolist())
+		graph.add_nodes_from(np.stack((v1, v2), axis=1).ravel().tolist())
+
+		keep = (v1 != v2) if not self_loop else np.ones(len(v1), dtype=bool)
+		if weighted:
+			graph.add_weighted_edges_from(zip(v1[keep].tolist(), v2[keep].tolist(), w[keep].tolist()))
+		else:
+			graph.add_edges_from(zip(v1[keep].tolist(), v2[keep].tolist()), weight=1.0)
+
+	return graph
+
+
+def read_edge_arrays(path, delimiter=None, file_format=None, node_order=False):
+	# edges without self-loops in file order, plus every node id of the file (even those only in self-loops). with
+	# node_order, also the positions of the node ids in the order networkx adds the nodes (first appearance).
+	all_v1, all_v2, all_nodes = [], [], []
+	for v1, v2, _, extra_nodes in iterate_edges(path, False, delimiter, file_format):
+		seen = np.stack((v1, v2), axis=1).ravel()
+		seen = seen if extra_nodes is None else np.concatenate((extra_nodes, seen))
+		nodes, first = np.unique(seen, return_index=True)
+		all_nodes.append(nodes[np.argsort(first)])
+		keep = v1 != v2
+		all_v1.append(v1[keep])
+		all_v2.append(v2[keep])
+
+	if len(all_nodes) == 0:
+		empty = np.zeros(0, dtype=np.int64)
+		return (empty, empty, empty, empty) if node_order else (empty, empty, empty)
+	node_ids, first = np.unique(np.concatenate(all_nodes), return_index=True)
+	v1, v2 = np.concatenate(all_v1), np.concatenate(all_v2)
+	return (v1, v2, node_ids, np.argsort(first)) if node_order else (v1, v2, node_ids)
+
+
+def load_csr_graph(path, delimiter=None, file_format=None):
+	# CSR graphs are unweighted and never hold self-loops.
+	v1, v2, node_ids, node_order = read_edge_arrays(path, delimiter, file_format, node_order=True)
+	graph = CSRGraph.from_edge_list(v1, v2, node_ids)
+	graph.node_order = node_order
+	return graph
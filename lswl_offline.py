@@ -3,30 +3,16 @@ import os.path
 import time
 import argparse
 import numpy as np
-
-
-def load_graph(path, weighted=False, delimiter='\t', self_loop=False):
-	graph = nx.Graph()
-	if not os.path.isfile(path):
-		print("Error: file " + path + " not found!")
-		exit(-1)
-
-	with open(path) as file:
-		for line in file.readlines():
-			w = 1.0
-			line = line.split(delimiter)
-			v1 = int(line[0])
-			v2 = int(line[1])
-			graph.add_node(v1)
-			graph.add_node(v2)
-
-			if weighted:
-				w = float(line[2])
-
-			if (self_loop and v1 == v2) or (v1 != v2):
-				graph.add_edge(v1, v2, weight=w)
-
-	return graph
+from graph_loader import load_graph
+from parallel_search import search_queries
+from csr_graph import CSRGraph
+from candidate_heap import CandidateHeap
+from phase_stats import PhaseStats
+from strength_cache import StrengthCache
+from result_cache import ResultCache
+from strength_precompute import precompute_strengths, has_precomputed_strengths
+from strength_index import load_strength_index
+from result_sink import open_result_sink, check_format, EXTENSIONS
 
 
 def read_query_nodes(path):
@@ -48,38 +34,68 @@ def create_argument_parser_main():
 	parser.add_argument("-n", "--network", help="network file address")
 	parser.add_argument("-q", "--query_nodes", help="query nodes file address")
 	parser.add_argument("-t", "--timeout", help="maximum time for LSWL to recover the community in seconds, default is 1 second.")
-	parser.add_argument("-o", "--output", help="path of the output file, default is './community.dat'.")
+	parser.add_argument("-o", "--output", help="path of the output file, default is './community.dat' ('./community' and the extension of the format for the other formats).")
+	parser.add_argument("-w", "--workers", help="number of processes answering the queries in parallel (sharing the graph), default is 1.")
+	parser.add_argument("-p", "--precompute", help="y/n, if strengths of all edges need to be computed once before answering the queries, default is 'n'.")
+	parser.add_argument("-x", "--index", help="y/n, if the on-disk strength index next to the network file needs to be used (built when missing or outdated), or the path of the index file (or of a directory keeping it) to use instead, default is 'n'.")
+	parser.add_argument("-f", "--stats", help="path of a json file receiving the time of every phase and counts of every query, the code is not instrumented by default.")
+	parser.add_argument("-c", "--cache", help="memory budget in MB of the common neighbor cache shared by all queries, no limit by default.")
+	parser.add_argument("-b", "--backend", help="'nx' to keep the graph in networkx or 'csr' for compact numpy arrays, default is 'nx'.")
+	parser.add_argument("-u", "--output_format", help="'text', 'jsonl', 'csv' or 'binary' (int32 members and offsets, read by result_sink.py), default is 'text'.")
+	parser.add_argument("-v", "--progress", help="y/n, if a line needs to be printed when a query is answered, default is 'y'.")
+	parser.add_argument("-r", "--result_cache", help="number of communities kept to answer repeated query nodes (of each worker) without a search, the least recently used are dropped first, 0 disables it (not with '-m y'), default is 0 (no limit with '-m y').")
+	parser.add_argument("-m", "--reuse_members", help="y/n, if a query node that is a member of a kept community is answered by that community instead of a search of its own, default is 'n'.")
+	parser.add_argument("-g", "--format", help="format of the network file, 'edgelist' or 'adjlist' (a node followed by its neighbors on every line), detected from its first lines by default.")
 	return parser.parse_args()
 
 
 class LSWLCommunityDiscovery():
 	minimum_improvement = 0.000001
-	def __init__(self, graph, strength_type, timeout):
-		# initializes the object
+	def __init__(self, graph, strength_type, timeout, strength_cache=None, result_cache=None):
+		# initializes the object, strength_cache is shared with other searchers of the same graph and strength type,
+		# result_cache with other searchers of the same graph.
 		self.graph = graph
+		self.is_csr = isinstance(graph, CSRGraph)
 		self.strength_type = strength_type
 		self.starting_node = None
 		self.community = []
+		self.community_set = set()	# members of the growing community, for constant time membership checks.
 		self.shell = set()
 		self.remove_self_loops()
-		self.dict_common_neighbors = {}
-		self.max_common_neighbors = {}
-		self.strength_assigned_nodes = set()
+		if strength_cache is None:
+			strength_cache = StrengthCache(graph, strength_type)
+		elif strength_cache.graph is not graph or strength_cache.strength_type != strength_type:
+			print("Error: the strength cache belongs to another graph or strength type!")
+			exit(-1)
+		if result_cache is not None and result_cache.graph is not graph:
+			print("Error: the result cache belongs to another graph!")
+			exit(-1)
+		self.strength_cache = strength_cache
+		self.result_cache = result_cache
+		self.dict_common_neighbors = strength_cache.common_neighbors
+		self.max_common_neighbors = strength_cache.max_common_neighbors
+		self.strength_assigned_nodes = strength_cache.assigned_nodes
+		self.strengths_precomputed = has_precomputed_strengths(graph, strength_type)
 		self.timer_timeout = timeout
 
 	def reset(self):
+		self.strength_cache.trim(self.community, self.shell)
 		self.community.clear()
+		self.community_set.clear()
 		self.shell.clear()
 
 	def remove_self_loops(self):
+		if self.is_csr:
+			return	# CSR graphs are built without self-loops.
 		for node in self.graph.nodes():
 			if self.graph.has_edge(node, node):
 				self.graph.remove_edge(node, node)
 
 	def set_start_node(self, start_node):
-		if start_node in self.graph.nodes():
+		if self.graph.has_node(start_node):
 			self.starting_node = start_node
 			self.community.append(start_node)
+			self.community_set.add(start_node)
 			self.shell = set(self.graph.neighbors(start_node))
 		else:
 			print('Invalid starting node! Try with another one.')
@@ -87,40 +103,65 @@ class LSWLCommunityDiscovery():
 
 	def update_sets_when_node_joins(self, node):
 		self.community.append(node)
+		self.community_set.add(node)
 		self.update_shell_when_node_joins(node)
 
 	def update_shell_when_node_joins(self, new_node):
-		self.shell.update(self.graph.neighbors(new_node))
-		for node in self.community:
-			self.shell.discard(node)
+		# the members among the neighbors are discarded after adding them all, see CandidateHeap for why.
+		neighbors = list(self.graph.neighbors(new_node))
+		self.shell.update(neighbors)
+		self.shell.discard(new_node)
+		for neighbor in neighbors:
+			if neighbor in self.community_set:
+				self.shell.discard(neighbor)
+
+	def number_of_common_neighbors(self, node, neighbor):
+		if self.is_csr:
+			return self.graph.number_of_common_neighbors(node, neighbor)
+		return sum(1 for _ in nx.common_neighbors(self.graph, node, neighbor))
+
+	def common_neighbor_counts(self, node):
+		# CSR graphs only, the counts of all edges of node at once.
+		return self.graph.common_neighbor_counts(node)
+
+	def get_strength(self, node, neighbor):
+		if self.is_csr:
+			return self.graph.get_strength(node, neighbor)
+		return self.graph[node][neighbor].get('strength', 0.0)
+
+	def neighbor_strengths(self, node):
+		if self.is_csr:
+			return self.graph.neighbor_strengths(node)
+		return {neighbor: attributes.get('strength', 0.0) for neighbor, attributes in self.graph[node].items()}
+
+	def set_strength(self, node, neighbor, strength):
+		if self.is_csr:
+			self.graph.set_strength(node, neighbor, strength)
+		else:
+			self.graph.add_edge(node, neighbor, strength=strength)
 
 	def update_dicts_of_common_neighbors_info(self, node):
-		if (node in self.dict_common_neighbors) is False:
-			self.dict_common_neighbors[node] = {}
-			self.max_common_neighbors[node] = -1
-
-		for neighbor in self.graph.neighbors(node):
-			if (neighbor in self.dict_common_neighbors[node]) is False:
-				if (neighbor in self.dict_common_neighbors) is False:
-					self.dict_common_neighbors[neighbor] = {}
-					self.max_common_neighbors[neighbor] = -1
-
-				number_common_neighbors = sum(1 for _ in nx.common_neighbors(self.graph, node, neighbor))
-				self.dict_common_neighbors[node][neighbor] = number_common_neighbors
-				self.dict_common_neighbors[neighbor][node] = number_common_neighbors
-
-				if number_common_neighbors > self.max_common_neighbors[node]:
-					self.max_common_neighbors[node] = number_common_neighbors
-				if number_common_neighbors > self.max_common_neighbors[neighbor]:
-					self.max_common_neighbors[neighbor] = number_common_neighbors
+		self.strength_cache.add_node(node)
+		common_neighbors = self.dict_common_neighbors[node]
+		counts = None
+		for e, neighbor in enumerate(self.graph.neighbors(node)):
+			# a neighbor may have been dropped from a bounded cache after its count with node was stored.
+			if (neighbor in common_neighbors) is False or (neighbor in self.dict_common_neighbors) is False:
+				if self.is_csr:
+					# the counts of all edges of node are found at once when the first one is missing.
+					counts = self.common_neighbor_counts(node) if counts is None else counts
+					self.strength_cache.set_common_neighbors(node, neighbor, counts[e])
+				else:
+					self.strength_cache.set_common_neighbors(node, neighbor, self.number_of_common_neighbors(node, neighbor))
 
 	def assign_local_strength(self, node):
-		if node in self.strength_assigned_nodes:
+		if self.strengths_precomputed or node in self.strength_assigned_nodes:
 			return
 
 		self.update_dicts_of_common_neighbors_info(node)
 		max_mutual_node = self.max_common_neighbors.get(node)
 
+		strengths = []
 		for neighbor in self.graph.neighbors(node):
 			max_mutual_neighbor = self.max_common_neighbors.get(neighbor)
 			strength = self.dict_common_neighbors.get(node).get(neighbor)
@@ -134,27 +175,90 @@ class LSWLCommunityDiscovery():
 				s2 = 0.0
 
 			strength = s1 + s2 - 1.0 if self.strength_type == 1 else (s1 + s2) / 2.0
-			self.graph.add_edge(node, neighbor, strength=strength)
+			if self.is_csr:
+				strengths.append(strength)
+			else:
+				self.set_strength(node, neighbor, strength)
+		if self.is_csr:
+			self.graph.set_neighbor_strengths(node, strengths)	# one write for the row instead of two lookups per edge.
 		self.strength_assigned_nodes.add(node)
 
+	def update_edges(self, added_edges=(), removed_edges=()):
+		# applies a batch of edge changes (removals first) to the graph and the strength cache shared by its searchers,
+		# between queries. only counts of pairs in a triangle with a changed edge change, they are adjusted in place
+		# and the strengths of the edges of their nodes are assigned again. returns the number of changed edges.
+		if self.is_csr:
+			print("Error: edges of a CSR graph can not be changed, load the graph with the 'nx' backend!")
+			exit(-1)
+		affected_nodes, changed_edges = set(), 0
+		for node, neighbor in removed_edges:
+			if node != neighbor and self.graph.has_edge(node, neighbor):
+				self.change_edge(node, neighbor, -1, affected_nodes)
+				changed_edges += 1
+		for node, neighbor in added_edges:
+			if node != neighbor and self.graph.has_edge(node, neighbor) is False:
+				self.change_edge(node, neighbor, 1, affected_nodes)
+				changed_edges += 1
+
+		self.strength_cache.refresh(affected_nodes)
+		if self.strengths_precomputed:
+			self.reassign_precomputed_strengths(affected_nodes)
+		return changed_edges
+
+	def add_edges(self, edges):
+		return self.update_edges(added_edges=edges)
+
+	def remove_edges(self, edges):
+		return self.update_edges(removed_edges=edges)
+
+	def add_edge(self, node, neighbor):
+		return self.update_edges(added_edges=[(node, neighbor)])
+
+	def remove_edge(self, node, neighbor):
+		return self.update_edges(removed_edges=[(node, neighbor)])
+
+	def change_edge(self, node, neighbor, delta, affected_nodes):
+		# the common neighbors of node and neighbor gain (or lose) one common neighbor with each of them.
+		common_neighbors = []
+		if self.graph.has_node(node) and self.graph.has_node(neighbor):
+			common_neighbors = list(nx.common_neighbors(self.graph, node, neighbor))
+		if delta > 0:
+			self.graph.add_edge(node, neighbor)
+			if node in self.dict_common_neighbors or neighbor in self.dict_common_neighbors:
+				self.strength_cache.set_common_neighbors(node, neighbor, len(common_neighbors))
+		else:
+			self.graph.remove_edge(node, neighbor)
+			self.strength_cache.drop_pair(node, neighbor)
+		for common_neighbor in common_neighbors:
+			self.strength_cache.change_common_neighbors(node, common_neighbor, delta)
+			self.strength_cache.change_common_neighbors(neighbor, common_neighbor, delta)
+		affected_nodes.update(common_neighbors)
+		affected_nodes.update([node, neighbor])
+
+	def reassign_precomputed_strengths(self, nodes):
+		# precomputed strengths use the maximum count of each node over all its edges, so the counts of the affected
+		# nodes and of their neighbors are completed in the strength cache, where later batches find them.
+		for node in nodes:
+			self.update_dicts_of_common_neighbors_info(node)
+			for neighbor in self.graph.neighbors(node):
+				self.update_dicts_of_common_neighbors_info(neighbor)
+		for node in nodes:
+			max_mutual_node = self.max_common_neighbors[node]
+			for neighbor, strength in self.dict_common_neighbors[node].items():
+				max_mutual_neighbor = self.max_common_neighbors[neighbor]
+				s1 = strength / max_mutual_node if max_mutual_node != 0 else 0.0
+				s2 = strength / max_mutual_neighbor if max_mutual_neighbor != 0 else 0.0
+				self.set_strength(node, neighbor, s1 + s2 - 1.0 if self.strength_type == 1 else (s1 + s2) / 2.0)
+
 	def find_best_next_node(self, improvements):
 		new_node = self.community[-1]
-		for node in self.shell:
-			if (node in improvements) is False:
-				improvements[node] = self.graph[node][new_node].get('strength', 0.0)
-			elif self.graph.has_edge(node, new_node):
-				improvements[node] += self.graph[node][new_node].get('strength', 0.0)
-		if new_node in improvements:
-			del improvements[new_node]
-
-		best_candidate = None
-		best_improvement = -float('inf')
-		for candidate in self.shell:
-			if improvements[candidate] > best_improvement:
-				best_candidate = candidate
-				best_improvement = improvements[candidate]
-
-		return best_candidate, best_improvement
+		new_node_strengths = self.neighbor_strengths(new_node)
+		# only the neighbors of the new member gain an improvement, every node enters the shell as one of them.
+		for node, strength in new_node_strengths.items():
+			if node in self.shell:
+				improvements.add(node, strength)
+		improvements.remove(new_node)
+		return improvements.best(self.shell)
 
 	def merge_dangling_nodes(self):
 		neighborhood = set()
@@ -162,57 +266,73 @@ class LSWLCommunityDiscovery():
 			for neighbor in self.graph.neighbors(node):
 				neighborhood.add(neighbor)
 
-		dangling_neighbors = [node for node in neighborhood if self.graph.degree[node] == 1]
+		dangling_neighbors = [node for node in neighborhood if self.graph.degree(node) == 1]
 		self.community = list(set(self.community + dangling_neighbors))
 
 	def amend_small_communities(self):
 		if len(self.community) < 3 and len(self.shell) > 0:
 			start_node_for_amend = max(self.shell, key=self.graph.degree)
-			next_community_searcher = LSWLCommunityDiscovery(self.graph, self.strength_type, self.timer_timeout)
+			next_community_searcher = LSWLCommunityDiscovery(self.graph, self.strength_type, self.timer_timeout, self.strength_cache, self.result_cache)
 			new_members = next_community_searcher.community_search(start_node_for_amend, amend=False)
 			for new_member in new_members:
 				if (new_member in self.community) is False:
 					self.community.append(new_member)
 
 	def add_edge_weights(self, new_node, edge_weights):
-		for edge in self.graph.edges(new_node):
-			if edge[1] in self.community:
-				edge_weights.append((new_node, edge[1], self.graph[new_node][edge[1]].get('strength', 0.0)))
+		if self.is_csr:
+			# one read of the row of new_node instead of a binary search per edge.
+			for neighbor, strength in self.neighbor_strengths(new_node).items():
+				if neighbor in self.community_set:
+					edge_weights.append((new_node, neighbor, strength))
+			return
+		for neighbor in self.graph.neighbors(new_node):
+			if neighbor in self.community_set:
+				edge_weights.append((new_node, neighbor, self.get_strength(new_node, neighbor)))
 
 
 	def remove_nodes(self, main_node, edge_weights):
 		if edge_weights == []:
 			return
 
-		edge_weights.sort(key=lambda x:x[2])
-		quartile = np.quantile(edge_weights, 0.25)
-
-		remaining_nodes, length = set([main_node]), 1
-		while True:
-			for n1, n2, w in edge_weights:
-				if w >= quartile and n1 in remaining_nodes:
-					remaining_nodes.add(n1)
-				elif w >= quartile and n2 in remaining_nodes:
-					remaining_nodes.add(n1)
-			if len(remaining_nodes) == length:
-				break
-			length = len(remaining_nodes)
+		quartile = np.quantile([w for _, _, w in edge_weights], 0.25)
+
+		# a member stays when it joined through an edge of weight >= the first quartile to a member that stays, starting from
+		# main_node. edges point from the member already in the community (n2) to the one that joined (n1).
+		later_members = {}
+		for n1, n2, w in edge_weights:
+			if w >= quartile:
+				later_members.setdefault(n2, []).append(n1)
+
+		remaining_nodes, stack = set([main_node]), [main_node]
+		while len(stack) > 0:
+			for node in later_members.get(stack.pop(), []):
+				if (node in remaining_nodes) is False:
+					remaining_nodes.add(node)
+					stack.append(node)
 
 		self.community = list(remaining_nodes)
 
 	def community_search(self, start_node, amend=True):
+		if self.result_cache is not None:
+			community = self.result_cache.get(start_node, self.strength_type, self.strength_cache.version, amend)
+			if community is not None:
+				self.community = list(community)	# kept until reset, which marks it as recently used in the strength cache.
+				return list(community)
+
 		start_timer = time.time()
 		self.set_start_node(start_node)
 		self.assign_local_strength(self.starting_node)
 
-		improvements, edge_weights = {}, list()
+		improvements, edge_weights = CandidateHeap(), list()
 		while len(self.community) < self.graph.number_of_nodes() and len(self.shell) > 0:
 			if time.time() > start_timer + self.timer_timeout:
 				print('Timeout!')
 				return []
 				
-			for node in self.shell:
-				self.assign_local_strength(node)
+			if self.strengths_precomputed is False:
+				for node in self.shell:
+					if (node in self.strength_assigned_nodes) is False:
+						self.assign_local_strength(node)
 
 			new_node, improvement = self.find_best_next_node(improvements)
 			if self.strength_type == 1 and improvement < LSWLCommunityDiscovery.minimum_improvement:
@@ -232,7 +352,10 @@ class LSWLCommunityDiscovery():
 		if amend:
 			self.amend_small_communities()
 		self.merge_dangling_nodes()
-		return sorted(self.community)	# sort is only for a better representation, can be ignored to boost performance.
+		community = sorted(self.community)	# sort is only for a better representation, can be ignored to boost performance.
+		if self.result_cache is not None:
+			self.result_cache.put(start_node, self.strength_type, self.strength_cache.version, community, amend)
+		return community
 
 
 if __name__ == "__main__":
@@ -240,18 +363,43 @@ if __name__ == "__main__":
 	
 	args = create_argument_parser_main()
 	
-	graph = load_graph(args.network)
 	query_nodes = read_query_nodes(args.query_nodes)
 	strength_type = 1 if args.strength_type == '1' else 2
 	timeout = float(args.timeout) if args.timeout != None and args.timeout.isnumeric() == True else 1.0
-	output = args.output if args.output != None else 'community.dat'
-
-	community_searcher = LSWLCommunityDiscovery(graph, strength_type, timeout)
-	with open(output, 'w') as file:
-		for e, node_number in enumerate(query_nodes):
-			community = community_searcher.community_search(start_node=node_number)
-			print(str(e + 1) + ' : ' + str(node_number) + ' > (' + str(len(community)) + ' nodes) -> ', community)
-			file.write(str(node_number) + ' : ' + str(community) + ' (' + str(len(community)) + ')\n')
-			community_searcher.reset()
-
+	output_format = args.output_format if args.output_format != None else 'text'
+	check_format(output_format)
+	output = args.output if args.output != None else ('community.dat' if output_format == 'text' else 'community' + EXTENSIONS[output_format])
+	progress = args.progress != 'n'
+	if args.index != None and args.index != 'n':
+		graph = load_strength_index(args.network, strength_type, args.index if args.index != 'y' else None, args.format)
+	else:
+		graph = load_graph(args.network, backend='csr' if args.backend == 'csr' else 'nx', file_format=args.format)
+		if args.precompute == 'y':
+			precompute_strengths(graph, strength_type)
+
+	strength_cache = StrengthCache(graph, strength_type, int(float(args.cache) * (1 << 20))) if args.cache != None else None
+	reuse_members = args.reuse_members == 'y'
+	max_results = int(args.result_cache) if args.result_cache != None else (None if reuse_members else 0)
+	if max_results == 0 and reuse_members:
+		print("Error: members of kept communities can not be reused without a result cache, '-r 0' can not be combined with '-m y'!")
+		exit(-1)
+	result_cache = ResultCache(graph, max_results, reuse_members) if max_results != 0 else None
+	community_searcher = LSWLCommunityDiscovery(graph, strength_type, timeout, strength_cache, result_cache)
+	workers = int(args.workers) if args.workers != None else 1
+	stats = PhaseStats() if args.stats != None else None
+	if stats != None and workers > 1:
+		print('Warning: phase statistics are only recorded in this process, the queries run in one process.')
+		workers = 1
+	if stats != None:
+		stats.instrument(community_searcher)
+	with open_result_sink(output, output_format) as sink:
+		for e, (node_number, community) in enumerate(search_queries(community_searcher, query_nodes, workers)):
+			if progress:
+				print(str(e + 1) + ' : ' + str(node_number) + ' > (' + str(len(community)) + ' nodes)')
+			sink.write(node_number, community)
+
+	if result_cache != None and workers == 1:
+		print('result cache =', result_cache.stats())
+	if stats != None:
+		print('phase statistics written to', stats.write(args.stats))
 	print('elapsed time =', time.time() - start_time)
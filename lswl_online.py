@@ -2,8 +2,16 @@ import networkx as nx
 import os.path
 import time
 import argparse
-import linecache
 import numpy as np
+from strength_index import open_strength_index
+from strength_precompute import has_precomputed_strengths
+from binary_graph import is_binary_graph, read_binary_graph
+from adjacency_reader import AdjacencyReader
+from csr_graph import CSRGraph
+from candidate_heap import CandidateHeap
+from neighbor_cache import NeighborCache, POLICIES
+from phase_stats import PhaseStats
+from result_sink import open_result_sink, check_format, EXTENSIONS
 
 
 def read_query_nodes(path):
@@ -22,61 +30,109 @@ def read_query_nodes(path):
 def create_argument_parser_main():
 	parser = argparse.ArgumentParser()
 	parser.add_argument("-s", "--strength_type", help="1 for weights in [-1,+1] and 2 for weights in [0,1], default is 2.")
-	parser.add_argument("-n", "--network", help="network file address")
+	parser.add_argument("-n", "--network", help="network file address, an adjacency list or a binary graph built by binary_graph.py")
 	parser.add_argument("-q", "--query_nodes", help="query nodes file address")
 	parser.add_argument("-t", "--timeout", help="maximum time for LSWL to recover the community in seconds, default is 1 second.")
-	parser.add_argument("-o", "--output", help="path of the output file, default is './community.dat'.")
+	parser.add_argument("-o", "--output", help="path of the output file, default is './community.dat' ('./community' and the extension of the format for the other formats).")
+	parser.add_argument("-x", "--index", help="address of a strength index built by strength_index.py, read instead of the adjacency list when given.")
+	parser.add_argument("-c", "--cache", help="memory budget in MB of the neighbor cache shared by all queries, 0 disables it, default is 64.")
+	parser.add_argument("-r", "--reuse", help="if one searcher keeps the discovered graph and strengths for all queries (y/n), default is 'n'.")
+	parser.add_argument("-m", "--max_retained", help="number of discovered nodes above which a reused searcher drops what it kept, no limit by default.")
+	parser.add_argument("-f", "--stats", help="path of a json file receiving the time of every phase and counts of every query, the code is not instrumented by default.")
+	parser.add_argument("-e", "--eviction", help="eviction policy of the neighbor cache, 'lru' or 'clock', default is 'lru'.")
+	parser.add_argument("-u", "--output_format", help="'text', 'jsonl', 'csv' or 'binary' (int32 members and offsets, read by result_sink.py), default is 'text'.")
+	parser.add_argument("-v", "--progress", help="y/n, if a line needs to be printed when a query is answered, default is 'y'.")
+	parser.add_argument("-i", "--offset_index", help="path of the offset index of the adjacency list, or of a directory keeping it, default is the network address followed by '.lswloff' (kept in memory when it can not be written).")
 	return parser.parse_args()
 
 
+def open_neighbor_source(path, offset_index_path=None):
+	if is_binary_graph(path):
+		return read_binary_graph(path)
+	return AdjacencyReader(path, offset_index_path)
+
+
 class OnlineCommunitySearch:
 	minimum_improvement = 0.000001
-	def __init__(self, adj_list_address, strength_type, timeout):
+	def __init__(self, adj_list_address, strength_type, timeout, neighbor_source=None, max_retained_nodes=None):
+		# neighbor_source answers neighbors(node) and has_node(node): a CSR graph (a binary graph or a strength
+		# index) or an AdjacencyReader over the adjacency list, opened here when none is given, possibly behind
+		# a NeighborCache.
+		if neighbor_source is None:
+			neighbor_source = open_neighbor_source(adj_list_address)
+		strength_source = neighbor_source.source if isinstance(neighbor_source, NeighborCache) else neighbor_source
 		self.graph = nx.Graph()
 		self.adj_list_address = adj_list_address
+		self.neighbor_source = neighbor_source
+		self.strength_source = strength_source
+		self.strengths_precomputed = isinstance(strength_source, CSRGraph) and has_precomputed_strengths(strength_source, strength_type)
 		self.strength_type = strength_type
-		self.nodes_in_graph = set()
+		self.loaded_nodes = set()
 		self.community = []
+		self.community_set = set()	# members of the growing community, for constant time membership checks.
 		self.shell = set()
 		self.strength_assigned_nodes = set()
 		self.dict_common_neighbors = {}
 		self.max_common_neighbors = {}
 		self.timer_timeout = timeout
+		self.max_retained_nodes = max_retained_nodes
+
+	def reset(self):
+		# prepares the searcher for the next query of a batch. the discovered part of the graph, its common
+		# neighbors and strengths are kept for the next queries, unless they grew beyond max_retained_nodes.
+		self.community.clear()
+		self.community_set.clear()
+		self.shell.clear()
+		if self.max_retained_nodes != None and self.graph.number_of_nodes() > self.max_retained_nodes:
+			self.forget_graph()
+
+	def forget_graph(self):
+		self.graph.clear()
+		self.loaded_nodes.clear()
+		self.strength_assigned_nodes.clear()
+		self.dict_common_neighbors.clear()
+		self.max_common_neighbors.clear()
 
 	def add_edges_before_strength_assignment(self):
+		# nodes whose whole adjacency is already in the graph (loaded_nodes) are not read or added again.
 		d = {}
 		for node in self.shell:
-			d[node] = self.read_neighbors(node)
+			neighbors = self.read_neighbors(node)
+			if (node in self.loaded_nodes) is False:
+				d[node] = neighbors
 
-			for neigh in d[node]:
-				if (neigh in d) is False:
+			for neigh in neighbors:
+				if (neigh in d) is False and (neigh in self.loaded_nodes) is False:
 					d[neigh] = self.read_neighbors(neigh)
 
 		for key, value in d.items():
 			self.add_new_edges(key, value)
+			self.loaded_nodes.add(key)
 
 	def add_edge_weights(self, new_node, edge_weights):
 		for edge in self.graph.edges(new_node):
-			if edge[1] in self.community:
+			if edge[1] in self.community_set:
 				edge_weights.append((new_node, edge[1], self.graph[new_node][edge[1]].get('strength', 0.0)))
 
 	def remove_nodes(self, main_node, edge_weights):
 		if edge_weights == []:
 			return
 
-		edge_weights.sort(key=lambda x:x[2])
-		quartile = np.quantile(edge_weights, 0.25)
-
-		remaining_nodes, length = set([main_node]), 1
-		while True:
-			for n1, n2, w in edge_weights:
-				if w >= quartile and n1 in remaining_nodes:
-					remaining_nodes.add(n1)
-				elif w >= quartile and n2 in remaining_nodes:
-					remaining_nodes.add(n1)
-			if len(remaining_nodes) == length:
-				break
-			length = len(remaining_nodes)
+		quartile = np.quantile([w for _, _, w in edge_weights], 0.25)
+
+		# a member stays when it joined through an edge of weight >= the first quartile to a member that stays, starting from
+		# main_node. edges point from the member already in the community (n2) to the one that joined (n1).
+		later_members = {}
+		for n1, n2, w in edge_weights:
+			if w >= quartile:
+				later_members.setdefault(n2, []).append(n1)
+
+		remaining_nodes, stack = set([main_node]), [main_node]
+		while len(stack) > 0:
+			for node in later_members.get(stack.pop(), []):
+				if (node in remaining_nodes) is False:
+					remaining_nodes.add(node)
+					stack.append(node)
 
 		self.community = list(remaining_nodes)
 
@@ -84,7 +140,7 @@ class OnlineCommunitySearch:
 		start_timer = time.time()
 		self.initilize(start_node)
 
-		improvements, edge_weights = {}, list()
+		improvements, edge_weights = CandidateHeap(), list()
 		while len(self.community) < self.graph.number_of_nodes() and len(self.shell) > 0:
 			if time.time() > start_timer + self.timer_timeout:
 				print('Timeout!')
@@ -92,7 +148,8 @@ class OnlineCommunitySearch:
 
 			self.add_edges_before_strength_assignment()
 			for node in self.shell:
-				self.assign_local_strength(node)
+				if (node in self.strength_assigned_nodes) is False:
+					self.assign_local_strength(node)
 
 			new_node, improvement = self.find_best_next_node(improvements)
 			if self.strength_type == 1 and improvement < OnlineCommunitySearch.minimum_improvement:
@@ -116,13 +173,7 @@ class OnlineCommunitySearch:
 
   
 	def read_neighbors(self, node):
-		neighbors = []
-		line = linecache.getline(self.adj_list_address, node)
-		striped_line = line.split()
-		if len(striped_line) > 0 and int(striped_line[0]) == node:
-			for x in striped_line[1:]:
-				neighbors.append(int(x))
-		return neighbors
+		return self.neighbor_source.neighbors(node) if self.neighbor_source.has_node(node) else []
 
 	def real_degree(self, node):
 		return len(self.read_neighbors(node))
@@ -134,6 +185,7 @@ class OnlineCommunitySearch:
 	def initilize(self, start_node):
 		self.graph.add_node(start_node)
 		self.community.append(start_node)
+		self.community_set.add(start_node)
 		neighbors = self.read_neighbors(start_node)
 		self.add_new_edges(start_node, neighbors)
 		self.shell.update(neighbors)  
@@ -144,6 +196,12 @@ class OnlineCommunitySearch:
 		if node in self.strength_assigned_nodes:
 			return
 
+		if self.strengths_precomputed:
+			for neighbor, strength in self.strength_source.neighbor_strengths(node).items():
+				self.graph.add_edge(node, neighbor, strength=strength)
+			self.strength_assigned_nodes.add(node)
+			return
+
 		self.update_dicts_of_common_neighbors_info(node)
 		max_mutual_node = self.max_common_neighbors.get(node)
 
@@ -163,6 +221,9 @@ class OnlineCommunitySearch:
 			self.graph.add_edge(node, neighbor, strength=strength)
 		self.strength_assigned_nodes.add(node)
 
+	def number_of_common_neighbors(self, node, neighbor):
+		return sum(1 for _ in nx.common_neighbors(self.graph, node, neighbor))
+
 	def update_dicts_of_common_neighbors_info(self, node):
 		if (node in self.dict_common_neighbors) is False:
 			self.dict_common_neighbors[node] = {}
@@ -174,7 +235,7 @@ class OnlineCommunitySearch:
 					self.dict_common_neighbors[neighbor] = {}
 					self.max_common_neighbors[neighbor] = -1
 
-				number_common_neighbors = sum(1 for _ in nx.common_neighbors(self.graph, node, neighbor))
+				number_common_neighbors = self.number_of_common_neighbors(node, neighbor)
 				self.dict_common_neighbors[node][neighbor] = number_common_neighbors
 				self.dict_common_neighbors[neighbor][node] = number_common_neighbors
 
@@ -185,35 +246,26 @@ class OnlineCommunitySearch:
 
 	def find_best_next_node(self, improvements):
 		new_node = self.community[-1]
-		for node in self.shell:
-			if (node in improvements) is False:
-				improvements[node] = self.graph[node][new_node].get('strength', 0.0)
-			elif self.graph.has_edge(node, new_node):
-				improvements[node] += self.graph[node][new_node].get('strength', 0.0)
-
-		if new_node in improvements:
-			del improvements[new_node]
-
-		best_candidate = None
-		best_improvement = -float('inf')
-
-		for candidate in self.shell:
-			if candidate == new_node:
-				continue
-			if improvements[candidate] > best_improvement:
-				best_candidate = candidate
-				best_improvement = improvements[candidate]
-
-		return best_candidate, best_improvement
+		# only the neighbors of the new member gain an improvement, every node enters the shell as one of them.
+		for node, attributes in self.graph[new_node].items():
+			if node in self.shell:
+				improvements.add(node, attributes.get('strength', 0.0))
+		improvements.remove(new_node)
+		return improvements.best(self.shell)
 
 	def update_sets_when_node_joins(self, node, change_boundary=False):
 		self.community.append(node)
+		self.community_set.add(node)
 		self.update_shell_when_node_joins(node)
 
 	def update_shell_when_node_joins(self, new_node):
-		self.shell.update(self.graph.neighbors(new_node))
-		for node in self.community:
-			self.shell.discard(node)
+		# the members among the neighbors are discarded after adding them all, see CandidateHeap for why.
+		neighbors = list(self.graph.neighbors(new_node))
+		self.shell.update(neighbors)
+		self.shell.discard(new_node)
+		for neighbor in neighbors:
+			if neighbor in self.community_set:
+				self.shell.discard(neighbor)
 
 	def merge_dangling_nodes(self):
 		neighborhood = set()
@@ -229,7 +281,7 @@ class OnlineCommunitySearch:
 		if len(self.community) < 3:
 			if len(self.shell) > 0:
 				start_node_for_amend = max(self.shell, key=self.real_degree)
-				next_community_searcher = OnlineCommunitySearch(self.adj_list_address, self.strength_type, self.timer_timeout)
+				next_community_searcher = OnlineCommunitySearch(self.adj_list_address, self.strength_type, self.timer_timeout, self.neighbor_source)
 				new_members = next_community_searcher.community_search(start_node_for_amend, amend=False)
 				for new_member in new_members:
 					if (new_member in self.community) is False:
@@ -243,13 +295,42 @@ if __name__ == '__main__':
 	query_nodes = read_query_nodes(args.query_nodes)
 	strength_type = 1 if args.strength_type == '1' else 2
 	timeout = float(args.timeout) if args.timeout != None and args.timeout.isnumeric() == True else 1.0
-	output = args.output if args.output != None else 'community.dat'
+	output_format = args.output_format if args.output_format != None else 'text'
+	check_format(output_format)
+	output = args.output if args.output != None else ('community.dat' if output_format == 'text' else 'community' + EXTENSIONS[output_format])
+	progress = args.progress != 'n'
+	cache_size = float(args.cache) if args.cache != None else 64.0
+	eviction = args.eviction if args.eviction != None else 'lru'
+	if eviction not in POLICIES:
+		print("Error: unknown eviction policy " + eviction + "!")
+		exit(-1)
+
+	# opened once and shared by the searchers of all queries.
+	source = open_strength_index(args.index, strength_type) if args.index != None else open_neighbor_source(args.network, args.offset_index)
+	neighbor_source = NeighborCache(source, int(cache_size * (1 << 20)), eviction) if cache_size > 0 else source
 	
-	with open(output, 'w') as file:
+	reuse = args.reuse == 'y'
+	max_retained_nodes = int(args.max_retained) if args.max_retained != None else None
+	stats = PhaseStats() if args.stats != None else None
+
+	community_searcher = OnlineCommunitySearch(args.network, strength_type, timeout, neighbor_source, max_retained_nodes) if reuse else None
+	with open_result_sink(output, output_format) as sink:
 		for e, node_number in enumerate(query_nodes):
-			community_searcher = OnlineCommunitySearch(args.network, strength_type, timeout)
+			if not reuse:
+				community_searcher = OnlineCommunitySearch(args.network, strength_type, timeout, neighbor_source)
+			if stats != None and (not reuse or e == 0):
+				stats.instrument(community_searcher)
 			community = community_searcher.community_search(node_number)
-			print(str(e + 1) + ' : ' + str(node_number) + ' > (' + str(len(community)) + ' nodes)')
-			file.write(str(node_number) + ' : ' + str(community) + ' (' + str(len(community)) + ')\n')
-			del community_searcher
+			if progress:
+				print(str(e + 1) + ' : ' + str(node_number) + ' > (' + str(len(community)) + ' nodes)')
+			sink.write(node_number, community)
+			community_searcher.reset()
+	if reuse:
+		print('retained nodes =', community_searcher.graph.number_of_nodes())
+	if isinstance(neighbor_source, NeighborCache):
+		print('neighbor cache =', neighbor_source.stats())
+	if isinstance(source, AdjacencyReader):
+		print('adjacency reader memory =', source.memory_usage())
+	if stats != None:
+		print('phase statistics written to', stats.write(args.stats))
 	print('elapsed time =', time.time() - start_time)
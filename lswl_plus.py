@@ -1,33 +1,18 @@
 import networkx as nx
-from copy import deepcopy
-import os.path
 import time
 import random
+from collections import deque
+from functools import partial
 import argparse
-
-
-def load_graph(path, weighted=False, delimiter='\t', self_loop=False):
-	graph = nx.Graph()
-	if not os.path.isfile(path):
-		print("Error: file " + path + " not found!")
-		exit(-1)
-
-	with open(path) as file:
-		for line in file.readlines():
-			w = 1.0
-			line = line.split(delimiter)
-			v1 = int(line[0])
-			v2 = int(line[1])
-			graph.add_node(v1)
-			graph.add_node(v2)
-
-			if weighted:
-				w = float(line[2])
-
-			if (self_loop and v1 == v2) or (v1 != v2):
-				graph.add_edge(v1, v2, weight=w)
-
-	return graph
+from graph_loader import load_graph
+from parallel_search import map_in_workers, RoundWorkers
+from csr_graph import CSRGraph
+from candidate_heap import CandidateHeap
+from seed_pool import SeedPool, seed_priority, ORDERS
+from phase_stats import PhaseStats
+from result_sink import open_result_sink, check_format, EXTENSIONS
+from strength_precompute import precompute_strengths, has_precomputed_strengths
+from strength_index import load_strength_index
 
 
 def create_argument_parser_main():
@@ -36,7 +21,18 @@ def create_argument_parser_main():
 	parser.add_argument("-n", "--network", help="network file address")
 	parser.add_argument("-i", "--outlier", help="y/n, if outliers need to merge into communities, default is 'y'.")
 	parser.add_argument("-c", "--overlap", help="y/n, if overlapping communities need to be detected, default is 'n'.")
+	parser.add_argument("-p", "--precompute", help="y/n, if strengths of all edges need to be computed once and shared by the 10 runs (otherwise every run assigns them lazily), default is 'y'.")
+	parser.add_argument("-x", "--index", help="y/n, if the on-disk strength index next to the network file needs to be used (built when missing or outdated), or the path of the index file (or of a directory keeping it) to use instead, default is 'n'.")
 	parser.add_argument("-o", "--output", help="path of the output file, default is './community.dat'.")
+	parser.add_argument("-w", "--workers", help="number of processes expanding seeds in parallel, default is 1 (seeds are expanded one by one).")
+	parser.add_argument("-f", "--stats", help="path of a json file receiving the time of every phase and counts of every expanded seed, the code is not instrumented by default.")
+	parser.add_argument("-e", "--seeds_per_round", help="number of seeds expanded by the workers in a round, when given the partition depends on it but not on the number of workers (with 1 worker, seeds are expanded in rounds as well), default is 8 per worker (seeds are expanded one by one with 1 worker).")
+	parser.add_argument("-d", "--seed_order", help="order in which seeds are taken, 'random', 'degree' (highest degree first) or 'core' (highest k-core first), default is 'random'.")
+	parser.add_argument("-j", "--jobs", help="number of the 10 runs done at the same time, each by a process of its own, default is 1.")
+	parser.add_argument("-k", "--consensus", help="y/n, if the consensus partition of the 10 runs needs to be written to 'consensus.txt' (with the extension of the output format), default is 'n'.")
+	parser.add_argument("-r", "--seed", help="random seed, run i (1 to 10) uses seed + i, default is a random one.")
+	parser.add_argument("-u", "--output_format", help="format of the files of the runs ('1.txt' to '10.txt'), 'text', 'jsonl', 'csv' or 'binary' (int32 members and offsets, read by result_sink.py), default is 'text'.")
+	parser.add_argument("-g", "--format", help="format of the network file, 'edgelist' or 'adjlist' (a node followed by its neighbors on every line), detected from its first lines by default.")
 	return parser.parse_args()
 
 
@@ -44,12 +40,13 @@ class LSWLPlusCommunityDetection():
 	minimum_improvement = 0.000001
 	def __init__(self, graph, strength_type, merge_outliers, detect_overlap, nodes_to_ignore=set()):
 		self.graph = graph
-		self.graph_copy = deepcopy(self.graph)
+		self.is_csr = isinstance(graph, CSRGraph)
 		self.strength_type = strength_type
 		self.merge_outliers = merge_outliers
 		self.detect_overlap = detect_overlap
 		self.starting_node = None
 		self.community = []
+		self.community_set = set()	# members of the growing community, for constant time membership checks.
 		self.shell = set()
 		self.nodes_to_ignore = nodes_to_ignore
 		self.partition = []
@@ -57,13 +54,19 @@ class LSWLPlusCommunityDetection():
 		self.dict_common_neighbors = {}
 		self.max_common_neighbors = {}
 		self.strength_assigned_nodes = set()
+		self.strengths = {}	# lazily assigned strengths, kept out of the graph so that the graph can be shared by several runs.
+		self.strengths_precomputed = has_precomputed_strengths(graph, strength_type)
 		self.proccessed_nodes = set()
+		self.seed_pool = None	# nodes not processed yet, built when the first seed is picked.
 
 	def reset(self):
 		self.community.clear()
+		self.community_set.clear()
 		self.shell.clear()
 
 	def remove_self_loops(self):
+		if self.is_csr:
+			return	# CSR graphs are built without self-loops.
 		for node in self.graph.nodes():
 			if self.graph.has_edge(node, node):
 				self.graph.remove_edge(node, node)
@@ -71,20 +74,54 @@ class LSWLPlusCommunityDetection():
 	def set_start_node(self, start_node):
 		self.starting_node = start_node
 		self.community.append(start_node)
+		self.community_set.add(start_node)
 		self.shell = set(self.graph.neighbors(start_node))
-		for node in self.nodes_to_ignore:
-			self.shell.discard(node)
+		for node in self.graph.neighbors(start_node):
+			if node in self.nodes_to_ignore:
+				self.shell.discard(node)
 
 	def update_sets_when_node_joins(self, node):
 		self.community.append(node)
+		self.community_set.add(node)
 		self.update_shell_when_node_joins(node)
 
 	def update_shell_when_node_joins(self, new_node):
-		self.shell.update(self.graph.neighbors(new_node))
-		for node in self.community:
-			self.shell.discard(node)
-		for node in self.nodes_to_ignore:
-			self.shell.discard(node)
+		# the members among the neighbors are discarded after adding them all, see CandidateHeap for why.
+		neighbors = list(self.graph.neighbors(new_node))
+		self.shell.update(neighbors)
+		self.shell.discard(new_node)
+		for neighbor in neighbors:
+			if neighbor in self.community_set or neighbor in self.nodes_to_ignore:
+				self.shell.discard(neighbor)
+
+	def number_of_common_neighbors(self, node, neighbor):
+		if self.is_csr:
+			return self.graph.number_of_common_neighbors(node, neighbor)
+		return sum(1 for _ in nx.common_neighbors(self.graph, node, neighbor))
+
+	def get_strength(self, node, neighbor):
+		if self.strengths_precomputed is False:
+			return self.strengths.get(node, {}).get(neighbor, 0.0)
+		if self.is_csr:
+			return self.graph.get_strength(node, neighbor)
+		return self.graph[node][neighbor].get('strength', 0.0)
+
+	def neighbor_strengths(self, node):
+		if self.strengths_precomputed is False:
+			strengths = self.strengths.get(node, {})
+			return {neighbor: strengths.get(neighbor, 0.0) for neighbor in self.graph.neighbors(node)}
+		if self.is_csr:
+			return self.graph.neighbor_strengths(node)
+		return {neighbor: attributes.get('strength', 0.0) for neighbor, attributes in self.graph[node].items()}
+
+	def set_strength(self, node, neighbor, strength):
+		self.strengths.setdefault(node, {})[neighbor] = strength
+		self.strengths.setdefault(neighbor, {})[node] = strength
+
+	def get_weight(self, node, neighbor):
+		if self.is_csr:
+			return 1.0	# CSR graphs are only built from unweighted edge lists.
+		return self.graph[node][neighbor].get('weight', 0.0)
 
 	def update_dicts_of_common_neighbors_info(self, node):
 		if (node in self.dict_common_neighbors) is False:
@@ -97,7 +134,7 @@ class LSWLPlusCommunityDetection():
 					self.dict_common_neighbors[neighbor] = {}
 					self.max_common_neighbors[neighbor] = -1
 
-				number_common_neighbors = sum(1 for _ in nx.common_neighbors(self.graph, node, neighbor))
+				number_common_neighbors = self.number_of_common_neighbors(node, neighbor)
 				self.dict_common_neighbors[node][neighbor] = number_common_neighbors
 				self.dict_common_neighbors[neighbor][node] = number_common_neighbors
 
@@ -107,7 +144,7 @@ class LSWLPlusCommunityDetection():
 					self.max_common_neighbors[neighbor] = number_common_neighbors
 
 	def assign_local_strength(self, node):
-		if node in self.strength_assigned_nodes:
+		if self.strengths_precomputed or node in self.strength_assigned_nodes:
 			return
 
 		self.update_dicts_of_common_neighbors_info(node)
@@ -126,27 +163,18 @@ class LSWLPlusCommunityDetection():
 				s2 = 0.0
 
 			strength = s1 + s2 - 1.0 if self.strength_type == 1 else (s1 + s2) / 2.0
-			self.graph.add_edge(node, neighbor, strength=strength)
+			self.set_strength(node, neighbor, strength)
 		self.strength_assigned_nodes.add(node)
 
 	def find_best_next_node(self, improvements):
 		new_node = self.community[-1]
-		for node in self.shell:
-			if (node in improvements) is False:
-				improvements[node] = self.graph[node][new_node].get('strength', 0.0)
-			elif self.graph.has_edge(node, new_node):
-				improvements[node] += self.graph[node][new_node].get('strength', 0.0)
-		if new_node in improvements:
-			del improvements[new_node]
-
-		best_candidate = None
-		best_improvement = -float('inf')
-		for candidate in self.shell:
-			if improvements[candidate] > best_improvement:
-				best_candidate = candidate
-				best_improvement = improvements[candidate]
-
-		return best_candidate, best_improvement
+		new_node_strengths = self.neighbor_strengths(new_node)
+		# only the neighbors of the new member gain an improvement, every node enters the shell as one of them.
+		for node, strength in new_node_strengths.items():
+			if node in self.shell:
+				improvements.add(node, strength)
+		improvements.remove(new_node)
+		return improvements.best(self.shell)
 
 	def merge_dangling_nodes(self):
 		neighborhood = set()
@@ -155,52 +183,67 @@ class LSWLPlusCommunityDetection():
 				if (neighbor in self.nodes_to_ignore) is False:
 					neighborhood.add(neighbor)
 
-		dangling_neighbors = [node for node in neighborhood if self.graph.degree[node] == 1]
+		dangling_neighbors = [node for node in neighborhood if self.graph.degree(node) == 1]
 		self.community = list(set(self.community + dangling_neighbors))
 
 	def add_edge_weights(self, new_node, edge_weights):
-		for edge in graph.edges(new_node):
-			if edge[1] in self.community:
-				edge_weights.append((new_node, edge[1], self.graph[new_node][edge[1]].get('strength', 0.0)))
+		if self.is_csr:
+			# one read of the row of new_node instead of a binary search per edge.
+			for neighbor, strength in self.neighbor_strengths(new_node).items():
+				if neighbor in self.community_set:
+					edge_weights.append((new_node, neighbor, strength))
+			return
+		for neighbor in self.graph.neighbors(new_node):
+			if neighbor in self.community_set:
+				edge_weights.append((new_node, neighbor, self.get_strength(new_node, neighbor)))
 
 
 	def remove_nodes(self, main_node, edge_weights):
 		if edge_weights == []:
 			return
 
-		edge_weights.sort(key=lambda x:x[2])
-		median, L = 0.0, len(edge_weights)
+		weights = sorted(w for _, _, w in edge_weights)
+		median, L = 0.0, len(weights)
 
 		if L % 2 == 0:
-			median = (edge_weights[L // 2 - 1][2] + edge_weights[L // 2][2]) * 0.5
+			median = (weights[L // 2 - 1] + weights[L // 2]) * 0.5
 		else:
-			median = edge_weights[L // 2][2]
-
-		remaining_nodes, length = set([main_node]), 1
-		while True:
-			for n1, n2, w in edge_weights:
-				if w >= median and n1 in remaining_nodes:
-					remaining_nodes.add(n1)
-				elif w >= median and n2 in remaining_nodes:
-					remaining_nodes.add(n1)
-			if len(remaining_nodes) == length:
-				break
-			length = len(remaining_nodes)
+			median = weights[L // 2]
+
+		# a member stays when it joined through an edge of weight >= the median to a member that stays, starting from
+		# main_node. edges point from the member already in the community (n2) to the one that joined (n1).
+		later_members = {}
+		for n1, n2, w in edge_weights:
+			if w >= median:
+				later_members.setdefault(n2, []).append(n1)
+
+		remaining_nodes, stack = set([main_node]), [main_node]
+		while len(stack) > 0:
+			for node in later_members.get(stack.pop(), []):
+				if (node in remaining_nodes) is False:
+					remaining_nodes.add(node)
+					stack.append(node)
 
 		self.community = list(remaining_nodes)
 
 
 	def find_community(self, start_node=None):
 		if start_node == None:
-			remaining_nodes = set(self.graph.nodes() - self.proccessed_nodes)
-			start_node = random.choice(list(remaining_nodes))
+			if self.seed_pool is None:
+				self.seed_pool = SeedPool(self.graph, [node for node in self.graph.nodes() if (node in self.proccessed_nodes) is False])
+			start_node = self.seed_pool.pick()
+		self.add_community(self.expand_community(start_node))
+
+	def expand_community(self, start_node):
 		self.set_start_node(start_node)
 		self.assign_local_strength(self.starting_node)
 
-		improvements, edge_weights = {}, list()
+		improvements, edge_weights = CandidateHeap(), list()
 		while len(self.community) < self.graph.number_of_nodes() and len(self.shell) > 0:
-			for node in self.shell:
-				self.assign_local_strength(node)
+			if self.strengths_precomputed is False:
+				for node in self.shell:
+					if (node in self.strength_assigned_nodes) is False:
+						self.assign_local_strength(node)
 
 			new_node, improvement = self.find_best_next_node(improvements)
 			if self.strength_type == 1 and improvement < LSWLPlusCommunityDetection.minimum_improvement:
@@ -220,79 +263,247 @@ class LSWLPlusCommunityDetection():
 		if self.merge_outliers == True:
 			self.merge_dangling_nodes()
 
-		for node in self.community:
+		community = list(self.community)
+		self.reset()
+		return community
+
+	def add_community(self, community):
+		for node in community:
 			self.proccessed_nodes.add(node)
+		if self.seed_pool is not None:
+			for node in community:
+				self.seed_pool.discard(node)
 
 		if self.detect_overlap == False:
-			for node in self.community:
+			for node in community:
 				self.nodes_to_ignore.add(node)
 
-		self.partition.append(sorted(self.community))   # sort is only for a better representation, can be ignored to boost performance.
-		self.reset()
+		self.partition.append(sorted(community))   # sort is only for a better representation, can be ignored to boost performance.
+
+	def community_detection(self, workers=1, seed=None, seeds_per_round=None, seed_order='random'):
+		if seed_order not in ORDERS:
+			print("Error: unknown seed order " + str(seed_order) + "!")
+			exit(-1)
+		# the seeds are expanded in rounds with several workers, or whenever seeds_per_round is given (in this process
+		# with one worker), so that the partition is the same for any number of workers.
+		if workers > 1 or seeds_per_round != None:
+			if seeds_per_round == None:
+				# fewer seeds per round than that leave workers idle, more expand seeds against a state that is
+				# older, whose communities are then more often dropped for a seed taken earlier in the round.
+				seeds_per_round = 8 * workers
+			self.parallel_community_detection(workers, seed, seeds_per_round, seed_order)
+		else:
+			self.seed_pool = SeedPool(self.graph, [node for node in self.graph.nodes() if (node in self.proccessed_nodes) is False], seed_order)
+			while len(self.proccessed_nodes) < self.graph.number_of_nodes():
+				self.find_community()
 
-	def community_detection(self):
-		while len(self.proccessed_nodes) < self.graph_copy.number_of_nodes():
-			self.find_community()				
-		
 		self.nodes_to_ignore.clear()
 		if self.merge_outliers == True:
 			self.amend_partition()
 		return sorted(self.partition)
 
+	def parallel_community_detection(self, workers, seed, seeds_per_round, seed_order='random'):
+		# seeds are taken in a random order fixed by the seed (by decreasing degree or core number first, when
+		# seed_order asks for it), up to seeds_per_round of them that are not adjacent to each other per round.
+		# their communities are expanded by the workers against the state at the start of the round, and are
+		# then added in seed order: a seed already taken by an earlier community of the round is dropped, and
+		# without overlap, nodes taken earlier are removed from later communities. the partition depends on the
+		# seed, seeds_per_round and seed_order only, not on the number of workers (which only the default of
+		# seeds_per_round depends on).
+		if self.strengths_precomputed is False:
+			# lazily assigned strengths would depend on what every worker expanded before.
+			precompute_strengths(self.graph, self.strength_type)
+			self.strengths_precomputed = True
+
+		nodes = sorted(self.graph.nodes())
+		random.Random(seed).shuffle(nodes)
+		if seed_order != 'random':
+			# a stable sort, nodes of the same degree or core number stay in their random order.
+			priority = seed_priority(self.graph, seed_order)
+			nodes.sort(key=lambda node: priority[node], reverse=True)
+		seed_order = deque(nodes)
+
+		# the workers are forked once, and only receive the nodes taken in the last round (which they ignore from then
+		# on, as this process does) at the start of the next one.
+		with RoundWorkers(self.expand_community, self.ignore_nodes, workers) as round_workers:
+			changes = []
+			while len(self.proccessed_nodes) < self.graph.number_of_nodes() and len(seed_order) > 0:
+				seeds, blocked, deferred = [], set(), []
+				while len(seed_order) > 0 and len(seeds) < seeds_per_round:
+					node = seed_order.popleft()
+					if node in self.proccessed_nodes:
+						continue
+					if node in blocked:
+						deferred.append(node)
+						continue
+					seeds.append(node)
+					blocked.update(self.graph.neighbors(node))
+				seed_order.extendleft(reversed(deferred))
+
+				taken = set()
+				for start_node, community in zip(seeds, round_workers.map(seeds, changes)):
+					if start_node in taken:
+						continue
+					if self.detect_overlap == False:
+						community = [node for node in community if (node in taken) is False]
+					taken.update(community)
+					self.add_community(community)
+				changes = list(taken) if self.detect_overlap == False else []
+
+	def ignore_nodes(self, nodes):
+		self.nodes_to_ignore.update(nodes)
+
 	def amend_partition(self):
 		communities = [community for community in self.partition if len(community) in [1, 2]]
-
-		for community in communities:
-			self.partition.remove(community)
-
+		self.partition = [community for community in self.partition if (len(community) in [1, 2]) is False]
 		self.amend_partition_helper(communities)
 
-	def amend_partition_helper2(self, community, strength_dict):
+	def amend_partition_helper2(self, community, strength_dict, community_ids):
 		index_best_community_to_merge_into = list(strength_dict.keys())[0]
 		for index_community in strength_dict:
 			if strength_dict[index_community] > strength_dict[index_best_community_to_merge_into]:
 				index_best_community_to_merge_into = index_community
 		for node in community:
-			if (node in self.partition[index_best_community_to_merge_into]) is False:
+			ids = community_ids.setdefault(node, set())
+			if (index_best_community_to_merge_into in ids) is False:
 				self.partition[index_best_community_to_merge_into].append(node)
-		self.partition[index_best_community_to_merge_into].sort()
+				ids.add(index_best_community_to_merge_into)
+		return index_best_community_to_merge_into
 
 	def amend_partition_helper(self, communities):
+		# community_ids maps every node to the indexes of the communities it belongs to, a neighbor counts for the
+		# first of them, and communities that grow are sorted once at the end.
+		community_ids = {}
+		for i, community in enumerate(self.partition):
+			for node in community:
+				community_ids.setdefault(node, set()).add(i)
+
+		grown_communities = set()
 		for community in communities:
 			neighbors = set()
 			for node in community:
-				neighbors.update(self.graph_copy.neighbors(node))
+				neighbors.update(self.graph.neighbors(node))
 
 			strength_dict = {}
 			for neighbor in neighbors:
-				for i in range(len(self.partition)):
-					if neighbor in self.partition[i]:
-						for node_in_com in community:
-							if self.graph_copy.has_edge(node_in_com, neighbor):
-								strength_dict[i] = strength_dict.get(i, 0.0) + self.graph_copy[node_in_com][neighbor].get('weight', 0.0)
-						break
+				if len(community_ids.get(neighbor, ())) > 0:
+					i = min(community_ids[neighbor])
+					for node_in_com in community:
+						if self.graph.has_edge(node_in_com, neighbor):
+							strength_dict[i] = strength_dict.get(i, 0.0) + self.get_weight(node_in_com, neighbor)
 			if len(strength_dict) > 0:
-				self.amend_partition_helper2(community, strength_dict)
+				grown_communities.add(self.amend_partition_helper2(community, strength_dict, community_ids))
 			else:
 				self.partition.append(community)
+				for node in community:
+					community_ids.setdefault(node, set()).add(len(self.partition) - 1)
+
+		for i in grown_communities:
+			self.partition[i].sort()
+
+def detect_once(graph, strength_type, merge_outliers, detect_overlap, workers, seed_order, stats, seeds_per_round, seed):
+	random.seed(seed)
+	community_detector = LSWLPlusCommunityDetection(graph, strength_type, merge_outliers, detect_overlap, set())
+	if stats != None:
+		stats.instrument(community_detector)
+	return community_detector.community_detection(workers, seed, seeds_per_round, seed_order)
+
+
+def ensemble_detection(graph, strength_type, merge_outliers, detect_overlap, seeds, jobs=1, workers=1, seed_order='random', precompute=True, stats=None, seeds_per_round=None):
+	# yields the partition of one run per seed, in the order of seeds. strengths are computed once and shared by
+	# all the runs (unless precompute is False, then every run assigns them lazily). with jobs > 1, the runs are
+	# done by that many forked processes reading the same graph, each run expanding its seeds one by one.
+	if precompute and has_precomputed_strengths(graph, strength_type) is False:
+		precompute_strengths(graph, strength_type)
+	if jobs > 1:
+		workers = 1
+	return map_in_workers(partial(detect_once, graph, strength_type, merge_outliers, detect_overlap, workers, seed_order, stats, seeds_per_round), seeds, jobs)
+
+
+def consensus_partition(graph, partitions, threshold=0.7):
+	# connected components of the graph restricted to the edges whose two nodes are in a common community in at
+	# least a threshold fraction of the partitions. every node is in exactly one consensus community.
+	community_ids = []
+	for partition in partitions:
+		ids = {}
+		for i, community in enumerate(partition):
+			for node in community:
+				ids.setdefault(node, set()).add(i)
+		community_ids.append(ids)
+
+	kept_edges, no_ids = {}, set()
+	for node in graph.nodes():
+		for neighbor in graph.neighbors(node):
+			if node < neighbor:
+				together = sum(1 for ids in community_ids if len(ids.get(node, no_ids) & ids.get(neighbor, no_ids)) > 0)
+				if together >= threshold * len(partitions):
+					kept_edges.setdefault(node, []).append(neighbor)
+					kept_edges.setdefault(neighbor, []).append(node)
+
+	consensus, visited = [], set()
+	for node in graph.nodes():
+		if node in visited:
+			continue
+		visited.add(node)
+		community, stack = [node], [node]
+		while len(stack) > 0:
+			for neighbor in kept_edges.get(stack.pop(), []):
+				if (neighbor in visited) is False:
+					visited.add(neighbor)
+					community.append(neighbor)
+					stack.append(neighbor)
+		consensus.append(sorted(community))
+	return sorted(consensus)
+
 
 if __name__ == "__main__":
 	start_time = time.time()
 	
 	args = create_argument_parser_main()
 
-	graph = load_graph(args.network)
 	strength_type = 1 if args.strength_type == '1' else 2
 	merge_outliers = False if args.outlier == 'n' else True
 	detect_overlap = True if args.overlap == 'y' else False
 	output = args.output if args.output != None else 'community.dat'
-
-	for i in range(1, 11):
-		community_detector = LSWLPlusCommunityDetection(deepcopy(graph), strength_type, merge_outliers, detect_overlap)
-		partition = community_detector.community_detection()
-		with open(str(i) + '.txt', 'w') as file:
+	output_format = args.output_format if args.output_format != None else 'text'
+	check_format(output_format)
+	if args.index != None and args.index != 'n':
+		graph = load_strength_index(args.network, strength_type, args.index if args.index != 'y' else None, args.format)
+	else:
+		graph = load_graph(args.network, file_format=args.format)
+
+	workers = int(args.workers) if args.workers != None else 1
+	jobs = int(args.jobs) if args.jobs != None else 1
+	seed_order = args.seed_order if args.seed_order != None else 'random'
+	seeds_per_round = int(args.seeds_per_round) if args.seeds_per_round != None else None
+	if seeds_per_round != None and seeds_per_round < 1:
+		print("Error: seeds_per_round must be at least 1!")
+		exit(-1)
+	stats = PhaseStats() if args.stats != None else None
+	if stats != None and (workers > 1 or jobs > 1):
+		print('Warning: phase statistics are only recorded in this process, the runs and their seeds are done one by one.')
+		workers, jobs = 1, 1
+	if jobs > 1 and workers > 1:
+		print('Warning: runs done at the same time expand their seeds one by one.')
+
+	# the graph (or the memory mapped index) and the strengths are shared by all the runs.
+	seeds = [int(args.seed) + i if args.seed != None else random.randrange(2 ** 32) for i in range(1, 11)]
+	partitions = ensemble_detection(graph, strength_type, merge_outliers, detect_overlap, seeds, jobs, workers, seed_order, args.precompute != 'n', stats, seeds_per_round)
+	all_partitions = []
+	for i, partition in enumerate(partitions, 1):
+		with open_result_sink(str(i) + EXTENSIONS[output_format], output_format) as sink:
 			for e, com in enumerate(partition):
-				file.write(str(com) + ' (' + str(len(com)) + ')\n')
+				sink.write(None, com)
 				# print((e+1), ': (' + str(len(com)) + ') >', com)
-
+		if args.consensus == 'y':
+			all_partitions.append(partition)
 		print('elapsed time =', time.time() - start_time)
+
+	if args.consensus == 'y':
+		with open_result_sink('consensus' + EXTENSIONS[output_format], output_format) as sink:
+			for com in consensus_partition(graph, all_partitions):
+				sink.write(None, com)
+		print('consensus partition written to', sink.path)
+
+	if stats != None:
+		print('phase statistics written to', stats.write(args.stats))
@@ -1,34 +1,12 @@
-import networkx as nx
 import os.path
 import time
 import argparse
+from graph_loader import load_graph
+from parallel_search import search_queries
+from result_sink import open_result_sink, check_format, EXTENSIONS
 from random import random, shuffle
 
 
-def load_graph(path, weighted=False, delimiter='\t', self_loop=False):
-	graph = nx.Graph()
-	if not os.path.isfile(path):
-		print("Error: file " + path + " not found!")
-		exit(-1)
-
-	with open(path) as file:
-		for line in file.readlines():
-			w = 1.0
-			line = line.split(delimiter)
-			v1 = int(line[0])
-			v2 = int(line[1])
-			graph.add_node(v1)
-			graph.add_node(v2)
-
-			if weighted:
-				w = float(line[2])
-
-			if (self_loop and v1 == v2) or (v1 != v2):
-				graph.add_edge(v1, v2, weight=w)
-
-	return graph
-
-
 def read_query_nodes(path):
 	query_nodes = []
 	if not os.path.isfile(path):
@@ -46,7 +24,11 @@ def create_argument_parser_main():
 	parser = argparse.ArgumentParser()
 	parser.add_argument("-n", "--network", help="network file address")
 	parser.add_argument("-q", "--query_nodes", help="query nodes file address")
-	parser.add_argument("-o", "--output", help="path of the output file, default is './community.dat'.")
+	parser.add_argument("-o", "--output", help="path of the output file, default is './community.dat' ('./community' and the extension of the format for the other formats).")
+	parser.add_argument("-w", "--workers", help="number of processes answering the queries in parallel (sharing the graph), default is 1.")
+	parser.add_argument("-u", "--output_format", help="'text', 'jsonl', 'csv' or 'binary' (int32 members and offsets, read by result_sink.py), default is 'text'.")
+	parser.add_argument("-v", "--progress", help="y/n, if a line needs to be printed when a query is answered, default is 'y'.")
+	parser.add_argument("-g", "--format", help="format of the network file, 'edgelist' or 'adjlist' (a node followed by its neighbors on every line), detected from its first lines by default.")
 	return parser.parse_args()
 
 
@@ -55,14 +37,21 @@ class ModularityMCommunityDiscovery():
 		self.graph = graph
 		self.starting_node = None
 		self.community = []
+		self.community_set = set()	# members of the community, for constant time membership checks.
 		self.boundary = set()
 		self.shell = set()
+		self.inner_degree = {}	# key: node, value: number of its neighbors in the community.
+		self.inner_edges = 0	# edges inside the community, counted from both ends.
+		self.outer_edges = 0	# edges from the community to the rest of the graph.
 		self.remove_self_loops()
 
 	def reset(self):
 		self.community.clear()
+		self.community_set.clear()
 		self.boundary.clear()
 		self.shell.clear()
+		self.inner_degree.clear()
+		self.inner_edges, self.outer_edges = 0, 0
 
 	def remove_self_loops(self):
 		for node in self.graph.nodes():
@@ -73,6 +62,8 @@ class ModularityMCommunityDiscovery():
 		if start_node in self.graph.nodes():
 			self.starting_node = start_node
 			self.community.append(start_node)
+			self.community_set.add(start_node)
+			self.update_degrees_when_node_joins(start_node)
 			self.boundary.add(start_node)
 			self.shell = set(self.graph.neighbors(start_node))
 		else:
@@ -81,19 +72,32 @@ class ModularityMCommunityDiscovery():
 
 	def update_sets_when_node_joins(self, node, change_boundary=False):
 		self.community.append(node)
+		self.community_set.add(node)
+		self.update_degrees_when_node_joins(node)
 		if change_boundary:
 			self.update_boundary_when_node_joins(node)
 		self.update_shell_when_node_joins(node)
 
+	def update_degrees_when_node_joins(self, new_node):
+		self.inner_edges, self.outer_edges = self.modularity_counts('addition', new_node)
+		for neighbor in self.graph.neighbors(new_node):
+			self.inner_degree[neighbor] = self.inner_degree.get(neighbor, 0) + 1
+
+	def update_degrees_when_node_leaves(self, old_node):
+		self.inner_edges, self.outer_edges = self.modularity_counts('deletion', old_node)
+		for neighbor in self.graph.neighbors(old_node):
+			self.inner_degree[neighbor] -= 1
+
 	def update_shell_when_node_joins(self, new_node):
-		self.shell.update(self.graph.neighbors(new_node))
-		for node in self.community:
-			self.shell.discard(node)
+		self.shell.discard(new_node)
+		for neighbor in self.graph.neighbors(new_node):
+			if (neighbor in self.community_set) is False:
+				self.shell.add(neighbor)
 
 	def update_boundary_when_node_joins(self, new_node):
 		should_be_boundary = False
 		for neighbor in self.graph.neighbors(new_node):
-			if (neighbor in self.community) is False:
+			if (neighbor in self.community_set) is False:
 				should_be_boundary = True
 				break
 		if should_be_boundary:
@@ -101,6 +105,8 @@ class ModularityMCommunityDiscovery():
 
 	def update_sets_when_node_leaves(self, node, change_boundary=False):
 		self.community.remove(node)
+		self.community_set.discard(node)
+		self.update_degrees_when_node_leaves(node)
 		if change_boundary:
 			self.update_boundary_when_node_leaves(node)
 		self.update_shell_when_node_leaves(node)
@@ -109,7 +115,7 @@ class ModularityMCommunityDiscovery():
 		if old_node in self.boundary:
 			self.boundary.remove(old_node)
 			for node in self.graph.neighbors(old_node):
-				if node in self.community:
+				if node in self.community_set:
 					self.boundary.add(node)
 
 	def update_shell_when_node_leaves(self, old_node):
@@ -117,7 +123,7 @@ class ModularityMCommunityDiscovery():
 		for node in possibles_leaving_nodes:
 			should_leave_shell = True
 			for neighbor in self.graph.neighbors(node):
-				if neighbor in self.community:
+				if neighbor in self.community_set:
 					should_leave_shell = False
 					break
 			if should_leave_shell:
@@ -159,7 +165,7 @@ class ModularityMCommunityDiscovery():
 				neighbors = list(self.graph.neighbors(node))
 				shuffle(neighbors)
 				for neighbor in neighbors:
-					if (neighbor in self.community) is False:
+					if (neighbor in self.community_set) is False:
 						self.shell.add(neighbor)
 						if (neighbor in sorted_shell) is False:
 							sorted_shell.append(neighbor)
@@ -167,34 +173,30 @@ class ModularityMCommunityDiscovery():
 			if len(Q_list) == 0:
 				break
 
-		if self.starting_node in self.community:
+		if self.starting_node in self.community_set:
 			return sorted(self.community)
 		return []
 
 	def compute_modularity(self, auxiliary_info, candidate_node):
-		mode = auxiliary_info
-		ind_s, outd_s = 0, 0
-
-		community = list(self.community)
-		if mode == 'addition':
-			community.append(candidate_node)
-		elif mode == 'deletion':
-			community.remove(candidate_node)
-
-		for node in community:
-			for neighbor in self.graph.neighbors(node):
-				if neighbor in community:
-					ind_s += 1
-				else:
-					outd_s += 1
-
+		ind_s, outd_s = self.modularity_counts(auxiliary_info, candidate_node)
 		return float(ind_s) / float(outd_s)
 
+	def modularity_counts(self, auxiliary_info, candidate_node):
+		# inner and outer edge counts of the community after the candidate joins or leaves it: the candidate moves
+		# its edges to members between both counts and adds or takes away its edges to the rest of the graph.
+		inner_degree = self.inner_degree.get(candidate_node, 0)
+		outer_degree = self.graph.degree(candidate_node) - inner_degree
+		if auxiliary_info == 'addition':
+			return self.inner_edges + 2 * inner_degree, self.outer_edges - inner_degree + outer_degree
+		elif auxiliary_info == 'deletion':
+			return self.inner_edges - 2 * inner_degree, self.outer_edges + inner_degree - outer_degree
+		return self.inner_edges, self.outer_edges
+
 	def should_leave_boundary(self, possibly_leaving_node, neighbor_node):
 		neighbors = set(self.graph.neighbors(possibly_leaving_node))
 		neighbors.discard(neighbor_node)
 		for neighbor in neighbors:
-			if (neighbor in self.community) is False:
+			if (neighbor in self.community_set) is False:
 				return False
 		return True
 
@@ -203,16 +205,19 @@ if __name__ == "__main__":
 	start_time = time.time()
 	
 	args = create_argument_parser_main()
-	graph = load_graph(args.network)
+	graph = load_graph(args.network, file_format=args.format)
 	query_nodes = read_query_nodes(args.query_nodes)
-	output = args.output if args.output != None else 'community.dat'
+	output_format = args.output_format if args.output_format != None else 'text'
+	check_format(output_format)
+	output = args.output if args.output != None else ('community.dat' if output_format == 'text' else 'community' + EXTENSIONS[output_format])
+	progress = args.progress != 'n'
 
 	community_searcher = ModularityMCommunityDiscovery(graph)
-	with open(output, 'w') as file:
-		for e, node_number in enumerate(query_nodes):
-			community = community_searcher.community_search(start_node=node_number)
-			print(str(e) + ' : ' + str(node_number) + ' > (' + str(len(community)) + ' nodes)')
-			file.write(str(node_number) + ' : ' + str(community) + ' (' + str(len(community)) + ')\n')
-			community_searcher.reset()
+	workers = int(args.workers) if args.workers != None else 1
+	with open_result_sink(output, output_format) as sink:
+		for e, (node_number, community) in enumerate(search_queries(community_searcher, query_nodes, workers)):
+			if progress:
+				print(str(e) + ' : ' + str(node_number) + ' > (' + str(len(community)) + ' nodes)')
+			sink.write(node_number, community)
 
 	print('elapsed time =', time.time() - start_time)
\ No newline at end of file
@@ -1,34 +1,12 @@
-import networkx as nx
 import os.path
 import time
 import argparse
+from graph_loader import load_graph
+from parallel_search import search_queries
+from result_sink import open_result_sink, check_format, EXTENSIONS
 from random import random
 
 
-def load_graph(path, weighted=False, delimiter='\t', self_loop=False):
-	graph = nx.Graph()
-	if not os.path.isfile(path):
-		print("Error: file " + path + " not found!")
-		exit(-1)
-
-	with open(path) as file:
-		for line in file.readlines():
-			w = 1.0
-			line = line.split(delimiter)
-			v1 = int(line[0])
-			v2 = int(line[1])
-			graph.add_node(v1)
-			graph.add_node(v2)
-
-			if weighted:
-				w = float(line[2])
-
-			if (self_loop and v1 == v2) or (v1 != v2):
-				graph.add_edge(v1, v2, weight=w)
-
-	return graph
-
-
 def read_query_nodes(path):
 	query_nodes = []
 	if not os.path.isfile(path):
@@ -46,7 +24,11 @@ def create_argument_parser_main():
 	parser = argparse.ArgumentParser()
 	parser.add_argument("-n", "--network", help="network file address")
 	parser.add_argument("-q", "--query_nodes", help="query nodes file address")
-	parser.add_argument("-o", "--output", help="path of the output file, default is './community.dat'.")
+	parser.add_argument("-o", "--output", help="path of the output file, default is './community.dat' ('./community' and the extension of the format for the other formats).")
+	parser.add_argument("-w", "--workers", help="number of processes answering the queries in parallel (sharing the graph), default is 1.")
+	parser.add_argument("-u", "--output_format", help="'text', 'jsonl', 'csv' or 'binary' (int32 members and offsets, read by result_sink.py), default is 'text'.")
+	parser.add_argument("-v", "--progress", help="y/n, if a line needs to be printed when a query is answered, default is 'y'.")
+	parser.add_argument("-g", "--format", help="format of the network file, 'edgelist' or 'adjlist' (a node followed by its neighbors on every line), detected from its first lines by default.")
 	return parser.parse_args()
 
 
@@ -57,14 +39,22 @@ class ModularityRCommunityDiscovery():
 		self.graph = graph
 		self.starting_node = None
 		self.community = []
+		self.community_set = set()	# members of the community, for constant time membership checks.
 		self.boundary = set()
 		self.shell = set()
+		self.outside_degree = {}	# key: member, value: number of its neighbors outside the community.
+		self.interior_degree = {}	# key: member, value: number of its neighbors in the community but not in the boundary.
+		self.candidate_counts = {}	# key: shell node, value: (x, y, z) of compute_modularity, dropped when one of them changes.
 		self.remove_self_loops()
 
 	def reset(self):
 		self.community.clear()
+		self.community_set.clear()
 		self.boundary.clear()
 		self.shell.clear()
+		self.outside_degree.clear()
+		self.interior_degree.clear()
+		self.candidate_counts.clear()
 
 	def remove_self_loops(self):
 		for node in self.graph.nodes():
@@ -75,7 +65,10 @@ class ModularityRCommunityDiscovery():
 		if start_node in self.graph.nodes():
 			self.starting_node = start_node
 			self.community.append(start_node)
+			self.community_set.add(start_node)
 			self.boundary.add(start_node)
+			self.outside_degree[start_node] = self.graph.degree(start_node)
+			self.interior_degree[start_node] = 0
 			self.shell = set(self.graph.neighbors(start_node))
 		else:
 			print('Invalid starting node! Try with another one.')
@@ -83,19 +76,48 @@ class ModularityRCommunityDiscovery():
 
 	def update_sets_when_node_joins(self, node, change_boundary=False):
 		self.community.append(node)
+		self.community_set.add(node)
 		if change_boundary:
 			self.update_boundary_when_node_joins(node)
+		self.update_degrees_when_node_joins(node)
 		self.update_shell_when_node_joins(node)
 
+	def update_degrees_when_node_joins(self, new_node):
+		# x and y of a shell node change when one of its neighbors joins, z when a neighbor of one of its boundary
+		# neighbors joins: the counts of those shell nodes are dropped and computed again on the next step.
+		outside, interior = 0, 0
+		is_interior = (new_node in self.boundary) is False
+		self.candidate_counts.pop(new_node, None)
+		for neighbor in self.graph.neighbors(new_node):
+			self.candidate_counts.pop(neighbor, None)
+			if neighbor in self.community_set:
+				self.outside_degree[neighbor] -= 1
+				if is_interior:
+					self.interior_degree[neighbor] += 1
+				if neighbor in self.boundary:
+					for node in self.graph.neighbors(neighbor):
+						self.candidate_counts.pop(node, None)
+				else:
+					interior += 1
+			else:
+				outside += 1
+		self.outside_degree[new_node] = outside
+		self.interior_degree[new_node] = interior
+
 	def update_shell_when_node_joins(self, new_node):
-		self.shell.update(self.graph.neighbors(new_node))
-		for node in self.community:
-			self.shell.discard(node)
+		# the members among the neighbors are discarded after adding them all, as in lswl_offline.py (see CandidateHeap),
+		# here the layout of the shell set decides the order in which candidates draw their random tie-breaking keys.
+		neighbors = list(self.graph.neighbors(new_node))
+		self.shell.update(neighbors)
+		self.shell.discard(new_node)
+		for neighbor in neighbors:
+			if neighbor in self.community_set:
+				self.shell.discard(neighbor)
 
 	def update_boundary_when_node_joins(self, new_node):
 		should_be_boundary = False
 		for neighbor in self.graph.neighbors(new_node):
-			if (neighbor in self.community) is False:
+			if (neighbor in self.community_set) is False:
 				should_be_boundary = True
 				break
 		if should_be_boundary:
@@ -133,42 +155,47 @@ class ModularityRCommunityDiscovery():
 
 	def compute_modularity(self, auxiliary_info, candidate_node):
 		R, T = auxiliary_info
+		counts = self.candidate_counts.get(candidate_node)
+		if counts is None:
+			counts = self.candidate_counts[candidate_node] = self.compute_counts(candidate_node)
+		x, y, z = counts
+		return float(x - R * y - z * (1 - R)) / float(T - z + y), -z + y
+
+	def compute_counts(self, candidate_node):
 		x, y, z = 0, 0, 0
 		for neighbor in self.graph.neighbors(candidate_node):
 			if neighbor in self.boundary:
 				x += 1
+				if self.should_leave_boundary(neighbor, candidate_node):
+					z += self.interior_degree[neighbor]
 			else:
 				y += 1
-
-		for neighbor in [node for node in self.graph.neighbors(candidate_node) if node in self.boundary]:
-			if self.should_leave_boundary(neighbor, candidate_node):
-				for node in self.graph.neighbors(neighbor):
-					if (node in self.community) and ((node in self.boundary) is False):
-						z += 1
-		return float(x - R * y - z * (1 - R)) / float(T - z + y), -z + y
+		return x, y, z
 
 	def should_leave_boundary(self, possibly_leaving_node, neighbor_node):
-		neighbors = set(self.graph.neighbors(possibly_leaving_node))
-		neighbors.discard(neighbor_node)
-		for neighbor in neighbors:
-			if (neighbor in self.community) is False:
-				return False
-		return True
+		# every neighbor of the boundary node but neighbor_node is in the community.
+		outside_degree = self.outside_degree[possibly_leaving_node]
+		if (neighbor_node in self.community_set) is False:
+			outside_degree -= 1
+		return outside_degree == 0
 
 
 if __name__ == "__main__":
 	start_time = time.time()
 	
 	args = create_argument_parser_main()
-	graph = load_graph(args.network)
+	graph = load_graph(args.network, file_format=args.format)
 	query_nodes = read_query_nodes(args.query_nodes)
-	output = args.output if args.output != None else 'community.dat'
+	output_format = args.output_format if args.output_format != None else 'text'
+	check_format(output_format)
+	output = args.output if args.output != None else ('community.dat' if output_format == 'text' else 'community' + EXTENSIONS[output_format])
+	progress = args.progress != 'n'
 
 	community_searcher = ModularityRCommunityDiscovery(graph)
-	with open(output, 'w') as file:
-		for e, node_number in enumerate(query_nodes):
-			community = community_searcher.community_search(start_node=node_number)
-			print(str(e) + ' : ' + str(node_number) + ' > (' + str(len(community)) + ' nodes)')
-			file.write(str(node_number) + ' : ' + str(community) + ' (' + str(len(community)) + ')\n')
-			community_searcher.reset()
+	workers = int(args.workers) if args.workers != None else 1
+	with open_result_sink(output, output_format) as sink:
+		for e, (node_number, community) in enumerate(search_queries(community_searcher, query_nodes, workers)):
+			if progress:
+				print(str(e) + ' : ' + str(node_number) + ' > (' + str(len(community)) + ' nodes)')
+			sink.write(node_number, community)
 	print('elapsed time =', time.time() - start_time)
\ No newline at end of file
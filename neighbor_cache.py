@@ -0,0 +1,75 @@
+import sys
+from collections import OrderedDict
+
+
+POLICIES = ['lru', 'clock']
+# rough size of a cached entry: the dict slot and the tuple, plus one int object per neighbor.
+ENTRY_OVERHEAD = 100 + sys.getsizeof(())
+BYTES_PER_NEIGHBOR = 8 + sys.getsizeof(1 << 30)
+
+
+class NeighborCache():
+	# keeps the neighbors of recently read nodes of another neighbor source (an AdjacencyReader or a CSR graph)
+	# within a budget of max_bytes. 'lru' evicts the least recently used node, 'clock' gives every node that was
+	# used since the hand last passed it a second chance, which costs nothing on a hit.
+	def __init__(self, source, max_bytes=1 << 26, policy='lru'):
+		if policy not in POLICIES:
+			print("Error: unknown cache policy " + str(policy) + "!")
+			exit(-1)
+		self.source = source
+		self.max_bytes = max_bytes
+		self.policy = policy
+		self.entries = OrderedDict()   # key: node, value: [neighbors, size in bytes, referenced bit (clock only)].
+		self.bytes = 0
+		self.hits = 0
+		self.misses = 0
+		self.evictions = 0
+
+	def has_node(self, node):
+		return node in self.entries or self.source.has_node(node)
+
+	def __contains__(self, node):
+		return self.has_node(node)
+
+	def neighbors(self, node):
+		entry = self.entries.get(node)
+		if entry is not None:
+			self.hits += 1
+			if self.policy == 'lru':
+				self.entries.move_to_end(node)
+			else:
+				entry[2] = True
+			return entry[0]
+
+		self.misses += 1
+		neighbors = tuple(self.source.neighbors(node))
+		size = ENTRY_OVERHEAD + BYTES_PER_NEIGHBOR * len(neighbors)
+		if size <= self.max_bytes:
+			while self.bytes + size > self.max_bytes:
+				self.evict()
+			self.entries[node] = [neighbors, size, False]
+			self.bytes += size
+		return neighbors
+
+	def degree(self, node):
+		return len(self.neighbors(node))
+
+	def evict(self):
+		while True:
+			node, entry = self.entries.popitem(last=False)
+			if self.policy == 'clock' and entry[2]:
+				entry[2] = False
+				self.entries[node] = entry
+				continue
+			self.bytes -= entry[1]
+			self.evictions += 1
+			return
+
+	def clear(self):
+		self.entries.clear()
+		self.bytes = 0
+
+	def stats(self):
+		requests = self.hits + self.misses
+		return {'hits': self.hits, 'misses': self.misses, 'evictions': self.evictions, 'hit_rate': self.hits / requests if requests > 0 else 0.0,
+				'entries': len(self.entries), 'bytes': self.bytes, 'max_bytes': self.max_bytes, 'policy': self.policy}
@@ -0,0 +1,137 @@
+import queue
+import multiprocessing
+from functools import partial
+
+
+# the function run by the workers, set before they are forked so that they inherit it, and the searcher and
+# graph behind it, without copying: pages are only duplicated when a worker writes to them, which precomputed
+# CSR graphs and strength indexes never do.
+function_of_workers = None
+
+
+def call_in_worker(item):
+	# an invalid query node makes the searchers exit, which is handed to the main process instead of silently
+	# killing the worker.
+	try:
+		return function_of_workers(item)
+	except SystemExit as error:
+		return error
+
+
+def map_in_workers(function, items, workers=1, chunksize=1):
+	# yields function(item) for every item in order, computed by a pool of forked workers when workers > 1.
+	global function_of_workers
+	if workers > 1 and 'fork' not in multiprocessing.get_all_start_methods():
+		print('Warning: workers need the fork start method, everything runs in one process.')
+		workers = 1
+
+	if workers <= 1:
+		for item in items:
+			yield function(item)
+		return
+
+	function_of_workers = function
+	try:
+		with multiprocessing.get_context('fork').Pool(workers) as pool:
+			for result in pool.imap(call_in_worker, items, chunksize):
+				if isinstance(result, SystemExit):
+					raise result
+				yield result
+	finally:
+		function_of_workers = None
+
+
+def search_query(searcher, node):
+	community = searcher.community_search(node)
+	searcher.reset()
+	return community
+
+
+def search_queries(searcher, query_nodes, workers=1, chunksize=4):
+	# yields (query node, community) in the order of query_nodes, as soon as the community of a query and those
+	# of all queries before it are found. the searchers enforce their own timeouts, in the workers as well.
+	communities = map_in_workers(partial(search_query, searcher), query_nodes, workers, chunksize)
+	for node, community in zip(query_nodes, communities):
+		yield node, community
+
+
+def run_round_worker(function, update, tasks, results, index):
+	# loop of a worker of RoundWorkers, until it receives None.
+	while True:
+		task = tasks.get()
+		if task is None:
+			return
+		changes, items = task
+		try:
+			update(changes)
+			results.put((index, [function(item) for item in items]))
+		except (SystemExit, Exception) as error:
+			# handed to the main process, which would otherwise wait for this share forever.
+			results.put((index, error))
+
+
+class RoundWorkers():
+	# forked workers kept alive for all the rounds of a computation, instead of a pool forked for every round.
+	# every round, each worker first calls update(changes) with what changed in the main process since the last
+	# round, then function(item) for its share of the items. with one worker, function is called in this process,
+	# whose state is already up to date.
+	def __init__(self, function, update, workers):
+		if workers > 1 and 'fork' not in multiprocessing.get_all_start_methods():
+			print('Warning: workers need the fork start method, everything runs in one process.')
+			workers = 1
+		self.function = function
+		self.workers = workers
+		self.processes = []
+		self.tasks = []
+		if workers <= 1:
+			return
+		context = multiprocessing.get_context('fork')
+		self.results = context.Queue()
+		self.tasks = [context.Queue() for _ in range(workers)]
+		for index, tasks in enumerate(self.tasks):
+			process = context.Process(target=run_round_worker, args=(function, update, tasks, self.results, index), daemon=True)
+			process.start()
+			self.processes.append(process)
+
+	def map(self, items, changes):
+		# returns function(item) for every item in order. items are dealt to the workers in turn.
+		if self.workers <= 1:
+			return [self.function(item) for item in items]
+		for index, tasks in enumerate(self.tasks):
+			tasks.put((changes, items[index::self.workers]))
+		shares, waiting = [None] * self.workers, set(range(self.workers))
+		while len(waiting) > 0:
+			try:
+				index, share = self.results.get(timeout=1.0)
+			except queue.Empty:
+				# a worker killed (by the system running out of memory, or a signal) would never send its share.
+				for index in waiting:
+					if self.processes[index].is_alive() is False:
+						print("Error: worker " + str(index) + " died with exit code " + str(self.processes[index].exitcode) + "!")
+						exit(-1)
+				continue
+			if isinstance(share, BaseException):
+				raise share
+			shares[index] = share
+			waiting.discard(index)
+		output = [None] * len(items)
+		for index, share in enumerate(shares):
+			output[index::self.workers] = share
+		return output
+
+	def close(self, failed=False):
+		# after a failure, results of the other workers may still be waiting to be read, so they are terminated.
+		for tasks, process in zip(self.tasks, self.processes):
+			if failed:
+				process.terminate()
+			else:
+				tasks.put(None)
+		for process in self.processes:
+			process.join()
+		self.processes = []
+
+	def __enter__(self):
+		return self
+
+	def __exit__(self, exc_type, exc_value, traceback):
+		self.close(exc_type is not None)
@@ -0,0 +1,124 @@
+import json
+import time
+from neighbor_cache import NeighborCache
+
+
+# methods timed when a searcher is instrumented, those a searcher does not have are skipped.
+PHASES = ['assign_local_strength', 'add_edges_before_strength_assignment', 'find_best_next_node', 'update_shell_when_node_joins',
+		'remove_nodes', 'amend_small_communities', 'merge_dangling_nodes', 'amend_partition']
+# methods answering one query (or expanding one seed of LSWL+), each call is kept as a record of its own.
+QUERY_METHODS = ['community_search', 'expand_community']
+
+
+class PhaseStats():
+	# opt-in instrumentation of LSWLCommunityDiscovery, OnlineCommunitySearch and LSWLPlusCommunityDetection.
+	# instrument() replaces the methods of one searcher object by wrappers recording wall time per phase and counts,
+	# searchers that are not instrumented run their own methods and pay nothing. after every query, its record
+	# is handed to callback when one is given.
+	def __init__(self, callback=None):
+		self.callback = callback
+		self.seconds = {}
+		self.calls = {}
+		self.counters = {}
+		self.records = []
+		self.record = None	# the query running at the moment.
+
+	def add(self, table, record_table, key, value):
+		table[key] = table.get(key, 0) + value
+		if self.record is not None:
+			self.record[record_table][key] = self.record[record_table].get(key, 0) + value
+
+	def count(self, key, value=1):
+		self.add(self.counters, 'counters', key, value)
+
+	def timed(self, phase, method):
+		def wrapper(*args, **kwargs):
+			start_time = time.perf_counter()
+			try:
+				return method(*args, **kwargs)
+			finally:
+				self.add(self.seconds, 'seconds', phase, time.perf_counter() - start_time)
+				self.add(self.calls, 'calls', phase, 1)
+		return wrapper
+
+	def instrument(self, searcher):
+		for phase in PHASES:
+			if hasattr(searcher, phase):
+				setattr(searcher, phase, self.timed(phase, getattr(searcher, phase)))
+
+		# counts are taken around the timed phases, so that the time of the counting is not charged to them.
+		assign_local_strength = searcher.assign_local_strength
+		def count_strength_assignment(node):
+			assigned = len(searcher.strength_assigned_nodes)
+			assign_local_strength(node)
+			if len(searcher.strength_assigned_nodes) > assigned:
+				self.count('strength_assigned_nodes')
+			else:
+				self.count('strength_cache_hits')
+		searcher.assign_local_strength = count_strength_assignment
+
+		update_shell_when_node_joins = searcher.update_shell_when_node_joins
+		def record_shell_size(new_node):
+			update_shell_when_node_joins(new_node)
+			if self.record is not None:
+				self.record['shell_sizes'].append(len(searcher.shell))
+		searcher.update_shell_when_node_joins = record_shell_size
+
+		for method, counter in [('number_of_common_neighbors', 'common_neighbor_computations'), ('read_neighbors', 'neighbor_reads')]:
+			if hasattr(searcher, method):
+				setattr(searcher, method, self.counted(counter, getattr(searcher, method)))
+		if hasattr(searcher, 'common_neighbor_counts'):
+			# a batch of CSR graphs counts as one computation per pair.
+			searcher.common_neighbor_counts = self.counted_pairs('common_neighbor_computations', searcher.common_neighbor_counts)
+
+		for method in QUERY_METHODS:
+			if hasattr(searcher, method):
+				setattr(searcher, method, self.recorded(searcher, getattr(searcher, method)))
+		return searcher
+
+	def counted(self, counter, method):
+		def wrapper(*args, **kwargs):
+			self.count(counter)
+			return method(*args, **kwargs)
+		return wrapper
+
+	def counted_pairs(self, counter, method):
+		def wrapper(*args, **kwargs):
+			counts = method(*args, **kwargs)
+			self.count(counter, len(counts))
+			return counts
+		return wrapper
+
+	def recorded(self, searcher, method):
+		def wrapper(start_node, *args, **kwargs):
+			cache = searcher.neighbor_source if isinstance(getattr(searcher, 'neighbor_source', None), NeighborCache) else None
+			hits, misses = (cache.hits, cache.misses) if cache is not None else (0, 0)
+			self.record = {'node': start_node, 'seconds': {}, 'calls': {}, 'counters': {}, 'shell_sizes': []}
+			start_time = time.perf_counter()
+			try:
+				community = method(start_node, *args, **kwargs)
+				record = self.record
+				record['time'] = time.perf_counter() - start_time
+				record['community_size'] = len(community)
+			finally:
+				self.record = None
+			if cache is not None:
+				self.count('neighbor_cache_hits', cache.hits - hits)
+				self.count('neighbor_cache_misses', cache.misses - misses)
+				record['counters']['neighbor_cache_hits'] = cache.hits - hits
+				record['counters']['neighbor_cache_misses'] = cache.misses - misses
+			self.records.append(record)
+			if self.callback is not None:
+				self.callback(record)
+			return community
+		return wrapper
+
+	def summary(self):
+		return {'phases': {phase: {'calls': self.calls[phase], 'seconds': self.seconds[phase]} for phase in self.seconds},
+				'counters': dict(self.counters), 'queries': len(self.records),
+				'query_seconds': sum(record['time'] for record in self.records)}
+
+	def write(self, path):
+		with open(path, 'w') as file:
+			json.dump({'summary': self.summary(), 'queries': self.records}, file, indent=1)
+		return path
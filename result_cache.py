@@ -0,0 +1,72 @@
+from collections import OrderedDict
+
+
+class ResultCache():
+	# communities found by the searchers of one graph, keyed by query node, strength type and whether small
+	# communities were amended. they are only valid for one version of the graph (that of its strength cache), a
+	# change of the edges drops all of them. with max_entries, the least recently used ones are dropped first. with
+	# reuse, a query node that is a member of a kept (amended) community is answered by that community instead of
+	# a search of its own, which is faster but not always the community its own search would find.
+	def __init__(self, graph, max_entries=None, reuse=False):
+		self.graph = graph
+		self.max_entries = max_entries
+		self.reuse = reuse
+		self.version = None
+		self.communities = OrderedDict()	# key: (node, strength_type, amend), value: tuple of members, least recently used first.
+		self.member_of = {}	# key: (node, strength_type), value: dict whose keys are those of the kept communities containing node, first kept first.
+		self.hits = 0
+		self.reused = 0
+		self.misses = 0
+		self.evictions = 0
+
+	def check_version(self, version):
+		if version != self.version:
+			self.clear()
+			self.version = version
+
+	def get(self, node, strength_type, version, amend=True):
+		self.check_version(version)
+		key = (node, strength_type, amend)
+		community = self.communities.get(key)
+		if community is not None:
+			self.hits += 1
+		elif self.reuse and amend and (node, strength_type) in self.member_of:
+			key = next(iter(self.member_of[(node, strength_type)]))
+			community = self.communities[key]
+			self.reused += 1
+		else:
+			self.misses += 1
+			return None
+		self.communities.move_to_end(key)
+		return community
+
+	def put(self, node, strength_type, version, community, amend=True):
+		self.check_version(version)
+		key = (node, strength_type, amend)
+		if key in self.communities:
+			return
+		self.communities[key] = tuple(community)
+		if self.reuse and amend:
+			for member in community:
+				self.member_of.setdefault((member, strength_type), {})[key] = None
+		while self.max_entries is not None and len(self.communities) > self.max_entries:
+			self.forget(next(iter(self.communities)))
+			self.evictions += 1
+
+	def forget(self, key):
+		# members in another kept community are then answered by the first kept of those.
+		community = self.communities.pop(key)
+		if self.reuse and key[2]:
+			for member in community:
+				keys = self.member_of[(member, key[1])]
+				keys.pop(key, None)
+				if len(keys) == 0:
+					del self.member_of[(member, key[1])]
+
+	def clear(self):
+		self.communities.clear()
+		self.member_of.clear()
+
+	def stats(self):
+		return {'entries': len(self.communities), 'max_entries': self.max_entries, 'reuse': self.reuse, 'hits': self.hits, 'reused': self.reused,
+				'misses': self.misses, 'evictions': self.evictions, 'avoided_expansions': self.hits + self.reused}
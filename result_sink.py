@@ -0,0 +1,139 @@
+import csv
+import sys
+import json
+import argparse
+import numpy as np
+from array import array
+
+
+FORMATS = ['text', 'jsonl', 'csv', 'binary']
+EXTENSIONS = {'text': '.txt', 'jsonl': '.jsonl', 'csv': '.csv', 'binary': '.lswlc'}
+BUFFER_SIZE = 1 << 20
+MAGIC = b'LSWLCOM1'
+HEADER_SIZE = 64
+HEADER_DTYPE = np.dtype([('magic', 'S8'), ('count', '<i8'), ('members', '<i8'), ('keyed', '<i8')])
+
+
+def create_argument_parser_main():
+	parser = argparse.ArgumentParser()
+	parser.add_argument("-r", "--results", help="address of a binary result file, printed in the text format.")
+	return parser.parse_args()
+
+
+def check_format(file_format):
+	if file_format not in FORMATS:
+		print("Error: unknown output format " + str(file_format) + "!")
+		exit(-1)
+
+
+def open_result_sink(path, file_format='text', buffer_size=BUFFER_SIZE):
+	check_format(file_format)
+	sinks = {'text': TextSink, 'jsonl': JsonlSink, 'csv': CsvSink, 'binary': BinarySink}
+	return sinks[file_format](path, buffer_size)
+
+
+class ResultSink():
+	# writes communities as they are found through a large write buffer, so that a batch of any size never keeps
+	# more than the current community (and, for the binary format, two integers per community) in memory. key is
+	# the query node of the community, or None for the communities of a partition.
+	def __init__(self, path, buffer_size=BUFFER_SIZE, mode='w', newline=None):
+		self.path = path
+		self.file = open(path, mode, buffering=buffer_size, newline=newline)
+		self.count = 0
+
+	def __enter__(self):
+		return self
+
+	def __exit__(self, *exception):
+		self.close()
+
+	def close(self):
+		self.file.close()
+
+
+class TextSink(ResultSink):
+	# the format the codes always wrote: 'node : [members] (size)', or '[members] (size)' without a key.
+	def write(self, key, community):
+		line = str(community) + ' (' + str(len(community)) + ')\n'
+		self.file.write(line if key is None else str(key) + ' : ' + line)
+		self.count += 1
+
+
+class JsonlSink(ResultSink):
+	def write(self, key, community):
+		record = {'size': len(community), 'community': community} if key is None else {'node': key, 'size': len(community), 'community': community}
+		self.file.write(json.dumps(record) + '\n')
+		self.count += 1
+
+
+class CsvSink(ResultSink):
+	# one row per community, its members are separated by spaces in the last column.
+	def __init__(self, path, buffer_size=BUFFER_SIZE):
+		ResultSink.__init__(self, path, buffer_size, newline='')
+		self.writer = csv.writer(self.file)
+		self.writer.writerow(['node', 'size', 'community'])
+
+	def write(self, key, community):
+		self.writer.writerow(['' if key is None else key, len(community), ' '.join(str(member) for member in community)])
+		self.count += 1
+
+
+class BinarySink(ResultSink):
+	# header, the members of all communities as int32, then the keys (int64, the index of the community when it
+	# has none) and the offsets (int64, count + 1) of the communities, written by close() as they are only known
+	# at the end.
+	def __init__(self, path, buffer_size=BUFFER_SIZE):
+		ResultSink.__init__(self, path, buffer_size, mode='wb')
+		self.file.write(b'\0' * HEADER_SIZE)
+		self.keys = array('q')
+		self.offsets = array('q', [0])
+		self.keyed = False
+
+	def write(self, key, community):
+		try:
+			members = array('i', community)
+		except OverflowError:
+			print("Error: node ids of the binary output format need to fit in 32 bits!")
+			exit(-1)
+		if sys.byteorder == 'big':
+			members.byteswap()
+		self.file.write(members.tobytes())
+		self.keys.append(self.count if key is None else key)
+		self.keyed = self.keyed or key is not None
+		self.offsets.append(self.offsets[-1] + len(members))
+		self.count += 1
+
+	def close(self):
+		if self.file.closed:
+			return
+		self.file.write(np.frombuffer(self.keys, dtype=np.int64).astype('<i8').tobytes())
+		self.file.write(np.frombuffer(self.offsets, dtype=np.int64).astype('<i8').tobytes())
+		header = np.zeros(1, dtype=HEADER_DTYPE)
+		header[0] = (MAGIC, self.count, self.offsets[-1], int(self.keyed))
+		self.file.seek(0)
+		self.file.write(header.tobytes())
+		self.file.close()
+
+
+def read_binary_results(path):
+	# keys, offsets and members of a binary result file, memory mapped. community i is
+	# members[offsets[i]:offsets[i + 1]], found for the query node keys[i] (keys is None for a partition).
+	with open(path, 'rb') as file:
+		data = file.read(HEADER_DTYPE.itemsize)
+	header = np.frombuffer(data, dtype=HEADER_DTYPE)[0] if len(data) == HEADER_DTYPE.itemsize else None
+	if header is None or header['magic'] != MAGIC:
+		print("Error: file " + path + " is not a binary result file!")
+		exit(-1)
+	count, m = int(header['count']), int(header['members'])
+	members = np.memmap(path, dtype='<i4', mode='r', offset=HEADER_SIZE, shape=(m,)) if m > 0 else np.zeros(0, dtype='<i4')
+	keys = np.fromfile(path, dtype='<i8', count=count, offset=HEADER_SIZE + 4 * m)
+	offsets = np.fromfile(path, dtype='<i8', count=count + 1, offset=HEADER_SIZE + 4 * m + 8 * count)
+	return (keys if header['keyed'] else None), offsets, members
+
+
+if __name__ == "__main__":
+	args = create_argument_parser_main()
+	keys, offsets, members = read_binary_results(args.results)
+	for i in range(len(offsets) - 1):
+		community = members[offsets[i]:offsets[i + 1]].tolist()
+		print((str(int(keys[i])) + ' : ' if keys is not None else '') + str(community) + ' (' + str(len(community)) + ')')
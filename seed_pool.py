@@ -0,0 +1,88 @@
+import random
+
+
+ORDERS = ['random', 'degree', 'core']
+
+
+def core_numbers(graph):
+	# k-core number of every node (bucket algorithm of Batagelj and Zaversnik), for networkx and CSR graphs alike.
+	degree = {node: graph.degree(node) for node in graph.nodes()}
+	max_degree = max(degree.values(), default=0)
+	buckets = [[] for _ in range(max_degree + 1)]
+	for node, d in degree.items():
+		buckets[d].append(node)
+
+	core, k = {}, 0
+	while k <= max_degree:
+		if len(buckets[k]) == 0:
+			k += 1
+			continue
+		node = buckets[k].pop()
+		if node in core or degree[node] != k:
+			continue	# already removed, or moved to a lower bucket since it was put here.
+		core[node] = k
+		for neighbor in graph.neighbors(node):
+			if (neighbor in core) is False and degree[neighbor] > k:
+				degree[neighbor] -= 1
+				buckets[degree[neighbor]].append(neighbor)
+	return core
+
+
+def seed_priority(graph, order):
+	# key of every node for the ordered strategies, seeds with the highest key are taken first.
+	if order == 'degree':
+		return {node: graph.degree(node) for node in graph.nodes()}
+	return core_numbers(graph)
+
+
+class SeedPool():
+	# nodes that are not processed yet. with the 'random' order they are kept in an array with a position index,
+	# a random one is picked and any one is removed in O(1) (the last node moves into the freed slot). with the
+	# 'degree' or 'core' order they are taken from a list sorted once by that key, skipping removed nodes.
+	def __init__(self, graph, nodes, order='random', rng=random):
+		if order not in ORDERS:
+			print("Error: unknown seed order " + str(order) + "!")
+			exit(-1)
+		self.order = order
+		self.rng = rng
+		self.nodes = list(nodes)
+		self.position = None	# random order, key: node, value: its index in nodes.
+		self.remaining = None	# degree or core order, nodes not removed yet.
+		if order == 'random':
+			self.position = {node: i for i, node in enumerate(self.nodes)}
+		else:
+			priority = seed_priority(graph, order)
+			self.nodes.sort(key=lambda node: priority[node], reverse=True)
+			self.remaining = set(self.nodes)
+			self.next = 0
+
+	def __len__(self):
+		if self.order != 'random':
+			return len(self.remaining)
+		return len(self.position)
+
+	def __contains__(self, node):
+		if self.order != 'random':
+			return node in self.remaining
+		return node in self.position
+
+	def discard(self, node):
+		if self.order != 'random':
+			self.remaining.discard(node)
+			return
+		i = self.position.pop(node, None)
+		if i is None:
+			return
+		last = self.nodes.pop()
+		if last != node:
+			self.nodes[i] = last
+			self.position[last] = i
+
+	def pick(self):
+		if len(self) == 0:
+			return None
+		if self.order == 'random':
+			return self.nodes[self.rng.randrange(len(self.nodes))]
+		while (self.nodes[self.next] in self.remaining) is False:
+			self.next += 1
+		return self.nodes[self.next]
@@ -0,0 +1,132 @@
+from collections import OrderedDict
+
+
+# rough size of a cached node (its dict, the slots pointing to it and its maximum) and of one common neighbor count.
+ENTRY_OVERHEAD = 300
+BYTES_PER_PAIR = 50
+# fraction of the budget a trim drops the cache to once it is over budget, so that the next queries add nodes
+# without being trimmed again right away.
+LOW_WATER = 0.75
+
+
+class StrengthCache():
+	# common neighbor counts and the nodes whose local strengths are assigned, for one graph and strength type.
+	# it is shared by the searchers of that graph (the searcher of a query and those amending small communities),
+	# so that a node is only assigned once. the strengths themselves stay in the graph. with a budget of max_bytes,
+	# the least recently used nodes are dropped in a batch once a query ends over budget (trim), and assigned again
+	# when reached later.
+	def __init__(self, graph, strength_type, max_bytes=None):
+		self.graph = graph
+		self.strength_type = strength_type
+		self.max_bytes = max_bytes
+		self.common_neighbors = OrderedDict()	# key: node, value: {neighbor: number of common neighbors}, least recently used first.
+		self.max_common_neighbors = {}
+		self.assigned_nodes = set()
+		self.pairs = 0
+		self.evictions = 0
+		self.invalidations = 0
+		self.version = 0	# incremented whenever edges of the graph change.
+
+	def bytes(self):
+		return ENTRY_OVERHEAD * len(self.common_neighbors) + BYTES_PER_PAIR * self.pairs
+
+	def add_node(self, node):
+		if (node in self.common_neighbors) is False:
+			self.common_neighbors[node] = {}
+			self.max_common_neighbors[node] = -1
+
+	def set_common_neighbors(self, node, neighbor, number_common_neighbors):
+		self.add_node(node)
+		self.add_node(neighbor)
+		for a, b in [(node, neighbor), (neighbor, node)]:
+			counts = self.common_neighbors[a]
+			if (b in counts) is False:
+				self.pairs += 1
+			counts[b] = number_common_neighbors
+			if number_common_neighbors > self.max_common_neighbors[a]:
+				self.max_common_neighbors[a] = number_common_neighbors
+
+	def forget(self, node):
+		counts = self.common_neighbors.pop(node, None)
+		if counts is not None:
+			self.pairs -= len(counts)
+			del self.max_common_neighbors[node]
+		self.assigned_nodes.discard(node)
+
+	def trim(self, *recently_used):
+		# called between queries: the nodes of recently_used (the community and shell of the last query) become
+		# the most recently used ones and, when over budget, the least recently used nodes are dropped until the
+		# cache is down to LOW_WATER of the budget.
+		if self.max_bytes is None:
+			return
+		for nodes in recently_used:
+			for node in nodes:
+				if node in self.common_neighbors:
+					self.common_neighbors.move_to_end(node)
+		if self.bytes() <= self.max_bytes:
+			return
+		pairs_over = (self.bytes() - LOW_WATER * self.max_bytes) / BYTES_PER_PAIR
+		while len(self.common_neighbors) > 0 and pairs_over > 0:
+			node, counts = self.common_neighbors.popitem(last=False)
+			self.pairs -= len(counts)
+			pairs_over -= len(counts) + ENTRY_OVERHEAD / BYTES_PER_PAIR
+			del self.max_common_neighbors[node]
+			self.assigned_nodes.discard(node)
+			self.evictions += 1
+
+	def invalidate(self, nodes=None):
+		# after the edges of nodes changed (every node by default): their counts are dropped, and so are their counts
+		# in the dicts of their neighbors, whose strengths are assigned again as well when a searcher reaches them.
+		# the new strengths overwrite the old ones in the graph.
+		self.invalidations += 1
+		self.version += 1
+		if nodes is None:
+			self.clear()
+			return
+		nodes = set(nodes)
+		for node in nodes:
+			self.forget(node)
+		for node in nodes:
+			if self.graph.has_node(node) is False:
+				continue
+			for neighbor in self.graph.neighbors(node):
+				counts = self.common_neighbors.get(neighbor)
+				if counts is not None and node in counts:
+					del counts[node]
+					self.pairs -= 1
+					self.max_common_neighbors[neighbor] = max(counts.values(), default=-1)
+				self.assigned_nodes.discard(neighbor)
+
+	def change_common_neighbors(self, node, neighbor, delta):
+		# the count of a pair is kept in the dicts of both nodes, a bounded cache may have dropped one of them.
+		for a, b in [(node, neighbor), (neighbor, node)]:
+			counts = self.common_neighbors.get(a)
+			if counts is not None and b in counts:
+				counts[b] += delta
+
+	def drop_pair(self, node, neighbor):
+		for a, b in [(node, neighbor), (neighbor, node)]:
+			counts = self.common_neighbors.get(a)
+			if counts is not None and b in counts:
+				del counts[b]
+				self.pairs -= 1
+
+	def refresh(self, nodes):
+		# after a batch of edge changes adjusted the counts of nodes in place: their maximums are taken again from
+		# their counts, and their strengths are assigned again when a searcher reaches them.
+		self.version += 1
+		for node in nodes:
+			counts = self.common_neighbors.get(node)
+			if counts is not None:
+				self.max_common_neighbors[node] = max(counts.values(), default=-1)
+			self.assigned_nodes.discard(node)
+
+	def clear(self):
+		self.common_neighbors.clear()
+		self.max_common_neighbors.clear()
+		self.assigned_nodes.clear()
+		self.pairs = 0
+
+	def stats(self):
+		return {'nodes': len(self.common_neighbors), 'assigned_nodes': len(self.assigned_nodes), 'pairs': self.pairs, 'bytes': self.bytes(),
+				'max_bytes': self.max_bytes, 'evictions': self.evictions, 'invalidations': self.invalidations, 'version': self.version}
@@ -0,0 +1,139 @@
+import os.path
+import hashlib
+import argparse
+import numpy as np
+from graph_loader import load_graph
+from csr_graph import CSRGraph
+from strength_precompute import compute_strengths
+
+
+MAGIC = b'LSWLIDX2'
+HEADER_SIZE = 128
+HEADER_DTYPE = np.dtype([('magic', 'S8'), ('n', '<i8'), ('m', '<i8'), ('source_size', '<i8'), ('source_mtime', '<i8'), ('source_hash', 'S32')])
+# arrays in the order they are laid out after the header, their lengths are in number of nodes (n) or slots (m).
+ARRAYS = [('node_ids', '<i8', 'n'), ('indptr', '<i8', 'n+1'), ('indices', '<i4', 'm'), ('order', '<i4', 'm'), ('common_neighbors', '<i4', 'm'),
+		('max_common_neighbors', '<i4', 'n'), ('strength_1', '<f8', 'm'), ('strength_2', '<f8', 'm'), ('node_order', '<i8', 'n')]
+
+
+def create_argument_parser_main():
+	parser = argparse.ArgumentParser()
+	parser.add_argument("-n", "--network", help="network file address")
+	parser.add_argument("-x", "--index", help="path of the index file, or of a directory receiving it, default is the network address followed by '.lswlidx'.")
+	parser.add_argument("-g", "--format", help="format of the network file, 'edgelist' or 'adjlist' (a node followed by its neighbors on every line), detected from its first lines by default.")
+	return parser.parse_args()
+
+
+def default_index_path(path, index_path=None):
+	# index_path may also be a directory, the index is then named after the network file in it.
+	if index_path == None:
+		return path + '.lswlidx'
+	if os.path.isdir(index_path):
+		return os.path.join(index_path, os.path.basename(path) + '.lswlidx')
+	return index_path
+
+
+def hash_file(path):
+	sha = hashlib.sha256()
+	with open(path, 'rb') as file:
+		for chunk in iter(lambda: file.read(1 << 20), b''):
+			sha.update(chunk)
+	return sha.digest()
+
+
+def array_offsets(n, m):
+	offsets, offset = {}, HEADER_SIZE
+	for name, dtype, length in ARRAYS:
+		count = {'n': n, 'n+1': n + 1, 'm': m}[length]
+		offsets[name] = (offset, count)
+		offset += (count * np.dtype(dtype).itemsize + 63) // 64 * 64
+	return offsets, offset
+
+
+def build_strength_index(path, index_path=None, file_format=None):
+	index_path = default_index_path(path, index_path)
+	csr = load_graph(path, backend='csr', file_format=file_format)
+	common, max_common, strength_1, strength_2 = compute_strengths(csr)
+	arrays = {'node_ids': csr.node_ids, 'indptr': csr.indptr, 'indices': csr.indices, 'order': csr.order, 'common_neighbors': common,
+			'max_common_neighbors': max_common, 'strength_1': strength_1, 'strength_2': strength_2, 'node_order': csr.node_order}
+
+	stat = os.stat(path)
+	header = np.zeros(1, dtype=HEADER_DTYPE)
+	header[0] = (MAGIC, csr.n, len(csr.indices), stat.st_size, stat.st_mtime_ns, hash_file(path))
+	offsets, size = array_offsets(csr.n, len(csr.indices))
+
+	# written to a temporary file first so that a crashed build never leaves a truncated index behind.
+	with open(index_path + '.tmp', 'wb') as file:
+		file.truncate(size)
+		file.write(header.tobytes())
+		for name, dtype, _ in ARRAYS:
+			file.seek(offsets[name][0])
+			file.write(np.ascontiguousarray(arrays[name], dtype=dtype).tobytes())
+	os.replace(index_path + '.tmp', index_path)
+	return index_path
+
+
+def read_header(index_path):
+	with open(index_path, 'rb') as file:
+		data = file.read(HEADER_DTYPE.itemsize)
+	if len(data) < HEADER_DTYPE.itemsize:
+		return None
+	header = np.frombuffer(data, dtype=HEADER_DTYPE)[0]
+	return header if header['magic'] == MAGIC else None
+
+
+def is_up_to_date(path, index_path):
+	if not os.path.isfile(index_path):
+		return False
+	header = read_header(index_path)
+	if header is None:
+		return False
+	return source_unchanged(path, header)
+
+
+def source_unchanged(path, header):
+	stat = os.stat(path)
+	if header['source_size'] == stat.st_size and header['source_mtime'] == stat.st_mtime_ns:
+		return True
+	# the file was touched, the index is still valid as long as the content did not change.
+	return header['source_size'] == stat.st_size and header['source_hash'] == hash_file(path)
+
+
+def open_index_arrays(index_path):
+	header = read_header(index_path)
+	if header is None:
+		print("Error: file " + index_path + " is not a strength index!")
+		exit(-1)
+	offsets = array_offsets(int(header['n']), int(header['m']))[0]
+	arrays = {}
+	for name, dtype, _ in ARRAYS:
+		offset, count = offsets[name]
+		arrays[name] = np.memmap(index_path, dtype=dtype, mode='r', offset=offset, shape=(count,)) if count > 0 else np.zeros(0, dtype=dtype)
+	return arrays
+
+
+def open_strength_index(index_path, strength_type):
+	# the returned graph only maps the file, pages are loaded by the os when the queries touch them.
+	if not os.path.isfile(index_path):
+		print("Error: file " + index_path + " not found!")
+		exit(-1)
+	arrays = open_index_arrays(index_path)
+	strength = arrays['strength_1'] if strength_type == 1 else arrays['strength_2']
+	graph = CSRGraph(arrays['node_ids'], arrays['indptr'], arrays['indices'], arrays['order'], strength, arrays['node_order'])
+	graph.precomputed_strength_type = strength_type
+	return graph
+
+
+def load_strength_index(path, strength_type, index_path=None, file_format=None):
+	# opens the index of an edge list, it is (re)built first when it is missing or the edge list has changed.
+	index_path = default_index_path(path, index_path)
+	if not is_up_to_date(path, index_path):
+		build_strength_index(path, index_path, file_format)
+	return open_strength_index(index_path, strength_type)
+
+
+if __name__ == "__main__":
+	args = create_argument_parser_main()
+	if not os.path.isfile(args.network):
+		print("Error: file " + args.network + " not found!")
+		exit(-1)
+	print('index written to', build_strength_index(args.network, args.index, args.format))
@@ -0,0 +1,82 @@
+import numpy as np
+from csr_graph import CSRGraph
+
+
+def count_common_neighbors(csr, max_wedges=1 << 22):
+	# number of common neighbors of the two endpoints of every CSR slot. every wedge (i, j, k) with j a neighbor of i
+	# and k a neighbor of j is closed when (i, k) is an edge, which is a binary search in the sorted edge keys.
+	n, m = csr.n, len(csr.indices)
+	indptr, indices = csr.indptr, csr.indices.astype(np.int64)
+	degrees = np.diff(indptr)
+	sources = np.repeat(np.arange(n, dtype=np.int64), degrees)
+	edge_keys = sources * n + indices
+	wedges_per_slot = degrees[indices]
+
+	cumulative = np.cumsum(wedges_per_slot)
+	common = np.zeros(m, dtype=np.int32)
+	start = 0
+	while start < m:
+		done = cumulative[start - 1] if start > 0 else 0
+		end = max(start + 1, int(np.searchsorted(cumulative, done + max_wedges, side='right')))
+		end = min(end, m)
+
+		lengths = wedges_per_slot[start:end]
+		total = int(lengths.sum())
+		if total > 0:
+			wedge_slot = np.repeat(np.arange(end - start, dtype=np.int64), lengths)
+			offsets = np.repeat(indptr[indices[start:end]] - np.cumsum(lengths) + lengths, lengths)
+			k = indices[offsets + np.arange(total, dtype=np.int64)]
+			keys = sources[start:end][wedge_slot] * n + k
+			found = np.minimum(np.searchsorted(edge_keys, keys), m - 1)
+			closed = edge_keys[found] == keys
+			common[start:end] = np.bincount(wedge_slot[closed], minlength=end - start)
+		start = end
+
+	return common
+
+
+def compute_strengths(csr, common=None):
+	# strengths of both types for every slot, computed in the same order of operations as assign_local_strength.
+	if common is None:
+		common = count_common_neighbors(csr)
+	degrees = np.diff(csr.indptr)
+	sources = np.repeat(np.arange(csr.n, dtype=np.int64), degrees)
+
+	max_common = np.full(csr.n, -1, dtype=np.int32)
+	np.maximum.at(max_common, sources, common)
+
+	with np.errstate(divide='ignore', invalid='ignore'):
+		s1 = common / max_common[sources].astype(np.float64)
+		s2 = common / max_common[csr.indices].astype(np.float64)
+	s1[max_common[sources] == 0] = 0.0
+	s2[max_common[csr.indices] == 0] = 0.0
+
+	strength_1 = s1 + s2 - 1.0
+	strength_2 = (s1 + s2) / 2.0
+	return common, max_common, strength_1, strength_2
+
+
+def precompute_strengths(graph, strength_type):
+	# fills the strength of every edge of a networkx or CSR graph once, the searchers then only read them.
+	csr = graph if isinstance(graph, CSRGraph) else CSRGraph.from_networkx(graph)
+	strength_1, strength_2 = compute_strengths(csr)[2:]
+	strength = strength_1 if strength_type == 1 else strength_2
+
+	if isinstance(graph, CSRGraph):
+		graph.strength = strength.astype(np.float64)
+		graph.precomputed_strength_type = strength_type
+		return graph
+
+	node_ids = csr.node_ids.tolist()
+	sources = np.repeat(np.arange(csr.n, dtype=np.int64), np.diff(csr.indptr))
+	upper = np.flatnonzero(sources < csr.indices)
+	for u, v, s in zip(sources[upper].tolist(), csr.indices[upper].tolist(), strength[upper].tolist()):
+		graph[node_ids[u]][node_ids[v]]['strength'] = s
+	graph.graph['precomputed_strength_type'] = strength_type
+	return graph
+
+
+def has_precomputed_strengths(graph, strength_type):
+	if isinstance(graph, CSRGraph):
+		return graph.precomputed_strength_type == strength_type
+	return graph.graph.get('precomputed_strength_type') == strength_type